@@ -0,0 +1,341 @@
+""" Асинхронный клиент MyStat на aiohttp.
+
+    Тот же набор методов, что у MyStatSDK, но корутинами: один event loop
+    держит сотни запросов в полёте без потока на каждый. Разбор ответов
+    не дублируется — используются парсеры MyStatSDK._parse_*.
+
+    Требует: pip install aiohttp
+    """
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Optional, List, Dict, Any, AsyncIterator, Set
+
+import aiohttp
+
+from cache import MemoryCache
+from core import MyStatSDK, Homework, HomeworkList
+
+logger = logging.getLogger("MyStatSDK")
+
+
+class AsyncMyStatSDK:
+    BASE_URL = MyStatSDK.BASE_URL
+    TOKEN_LIFETIME = MyStatSDK.TOKEN_LIFETIME
+    pause = MyStatSDK.pause
+    REQUEST_TIMEOUT = MyStatSDK.REQUEST_TIMEOUT
+    LIMIT = 100  # всего одновременных соединений в пуле
+    LIMIT_PER_HOST = 20  # соединений на один хост
+    FS_HOSTS = MyStatSDK.FS_HOSTS
+    CACHE_TTLS = MyStatSDK.CACHE_TTLS
+    DEFAULT_CACHE_TTL = MyStatSDK.DEFAULT_CACHE_TTL
+    ENDPOINTS = MyStatSDK.ENDPOINTS
+    _endpoint_of = MyStatSDK._endpoint_of
+    _cache_ttl = MyStatSDK._cache_ttl
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        proxy: Optional[str] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+        limit: Optional[int] = None,
+        limit_per_host: Optional[int] = None,
+        base_url: Optional[str] = None,
+        ssl: Any = None,
+        memory_cache: Optional[MemoryCache] = None,
+    ):
+        """
+        Инициализация клиента:
+        :param username: логин пользователя
+        :param password: пароль пользователя
+        :param proxy: URL прокси, например 'http://...'
+        :param session: готовая aiohttp.ClientSession (общий пул); если None — создаётся при первом запросе
+        :param limit: лимит соединений в пуле (по умолчанию LIMIT)
+        :param limit_per_host: лимит соединений на хост (по умолчанию LIMIT_PER_HOST)
+        :param base_url: корень API (по умолчанию BASE_URL)
+        :param ssl: параметр ssl для aiohttp (SSLContext, False — без проверки сертификата)
+        :param memory_cache: кеш в памяти (по умолчанию cache.MemoryCache)
+        """
+        self.username = username
+        self.password = password
+        self.proxy = proxy
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.ssl = ssl
+        self.session_token: Optional[str] = None
+        self.token_time: float = 0.0
+        self.memory_cache = memory_cache if memory_cache is not None else MemoryCache()
+        self._http = session
+        self._owns_http = session is None
+        self._limit = limit or self.LIMIT
+        self._limit_per_host = limit_per_host or self.LIMIT_PER_HOST
+        self._login_lock: Optional[asyncio.Lock] = None
+        self._tasks: Set[asyncio.Future] = set()  # фоновые подкачки страниц iter_homeworks
+        self._closed = False
+
+    def _session(self) -> aiohttp.ClientSession:
+        # ClientSession нужно создавать внутри работающего loop, поэтому лениво
+        if self._closed:
+            raise RuntimeError("AsyncMyStatSDK уже закрыт")
+        if self._http is None or self._http.closed:
+            connector = aiohttp.TCPConnector(limit=self._limit, limit_per_host=self._limit_per_host, ssl=self.ssl)
+            self._http = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.REQUEST_TIMEOUT),
+            )
+            self._owns_http = True
+        return self._http
+
+    async def close(self) -> None:
+        """
+        Отменяет недокачанные страницы iter_homeworks и закрывает пул соединений
+        (если сессия создана самим клиентом). После close() запросы не делаются.
+        """
+        self._closed = True
+        tasks, self._tasks = list(self._tasks), set()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if self._owns_http and self._http is not None:
+            await self._http.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def login(self, stale_token: Optional[str] = None) -> bool:
+        """
+        Авторизация на сервере MyStat.
+        Параллельные вызовы ждут один общий логин, а не логинятся каждый сам.
+        :param stale_token: токен, который надо заменить (после 401); если его уже сменили — логина не будет
+        """
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        started = time.time()
+        async with self._login_lock:
+            # пока ждали замок, токен мог обновить другой вызов
+            if self._is_token_valid() and (self.token_time >= started or
+                                           (stale_token is not None and self.session_token != stale_token)):
+                return True
+            await asyncio.sleep(self.pause)
+            url = self.base_url + MyStatSDK.EP_LOGIN
+            try:
+                async with self._session().post(
+                    url,
+                    json={"login": self.username, "password": self.password},
+                    proxy=self.proxy,
+                ) as r:
+                    text = await r.text()
+                    if r.status == 200:
+                        self.session_token = MyStatSDK._parse_token(text)
+                        self.token_time = time.time()
+                        logger.info("Токен успешно получен.")
+                        return True
+                    logger.error("Ошибка авторизации: %s — %s", r.status, text)
+                    return False
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.exception("Ошибка при авторизации: %s", e)
+                return False
+
+    def _headers(self) -> Dict[str, str]:
+        """Возвращает заголовки для авторизации."""
+        return {"Authorization": f"Bearer {self.session_token}"} if self.session_token else {}
+
+    def _is_token_valid(self) -> bool:
+        """Проверяет, действителен ли текущий токен (по времени)."""
+        return bool(self.session_token) and (time.time() - self.token_time < self.TOKEN_LIFETIME)
+
+    async def ensure_token(self) -> bool:
+        """Логинится, если токена нет или он истёк."""
+        return self._is_token_valid() or await self.login()
+
+    def clear_cache(self) -> None:
+        """Очищает кеш в памяти для _get."""
+        self.memory_cache.clear()
+
+    async def _get(self, url: str, use_cache: bool = True, retry_auth: bool = True) -> Optional[Any]:
+        """
+        Асинхронный GET с таймаутом, кешем и авто-логином.
+        :param url: полный URL
+        :param use_cache: если True, ответ кешируется в рамках экземпляра
+        :return: распарсенный JSON или None
+        """
+        if use_cache:
+            data = self.memory_cache.get(url)
+            if data is not None:
+                return data
+
+        if not await self.ensure_token():
+            return None
+
+        try:
+            token = self.session_token
+            async with self._session().get(url, headers=self._headers(), proxy=self.proxy) as r:
+                if r.status == 401 and retry_auth:
+                    # токен отозван раньше срока — общий перелогин и одна повторная попытка
+                    if not await self.login(stale_token=token):
+                        return None
+                    return await self._get(url, use_cache, retry_auth=False)
+                if r.status == 200:
+                    body = await r.read()
+                    data = json.loads(body)
+                    if use_cache:
+                        self.memory_cache.set(url, data, self._cache_ttl(url) or self.DEFAULT_CACHE_TTL, size=len(body))
+                    return data
+                logger.error("Ошибка запроса %s: %s — %s", url, r.status, await r.text())
+                return None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.exception("Ошибка запроса %s: %s", url, e)
+            return None
+
+    # ---------------- API methods ----------------
+
+    async def get_grades(self) -> List[int]:
+        """Возвращает список оценок (ints)."""
+        return MyStatSDK._parse_grades(await self._get(self.base_url + MyStatSDK.EP_GRADES))
+
+    async def get_average_score(self) -> float:
+        """Берёт total_average_point из API (годовой)."""
+        return MyStatSDK._parse_average_score(await self._get(self.base_url + MyStatSDK.EP_PROGRESS))
+
+    async def get_leaderboard(self) -> List[str]:
+        """Возвращает список имён лидеров (fio_stud)."""
+        return MyStatSDK._parse_leaderboard(await self._get(self.base_url + MyStatSDK.EP_LEADERS))
+
+    async def get_homework(self) -> List[int]:
+        """Возвращает пару [done_count, overdue_count]."""
+        return MyStatSDK._parse_homework_counts(await self._get(self.base_url + MyStatSDK.EP_HW_COUNT))
+
+    async def get_homeworks_names(self) -> List[str]:
+        return MyStatSDK._parse_homeworks_names(await self._get(self.base_url + MyStatSDK.EP_HW_LIST))
+
+    async def get_id_hw(self):
+        return MyStatSDK._parse_homework_ids(await self._get(self.base_url + MyStatSDK.EP_HW_LIST))
+
+    async def get_homeworks_list(self):
+        return MyStatSDK._parse_homeworks_list(await self._get(self.base_url + MyStatSDK.EP_HW_LIST))
+
+    async def iter_homeworks(self, status: int = 3, page_size: int = 100) -> AsyncIterator[Homework]:
+        """
+        Ленивый постраничный обход истории ДЗ; следующая страница качается заранее (см. MyStatSDK.iter_homeworks,
+        там же — когда обход останавливается на повторной странице).
+        Если обход бросают на середине, генератор лучше закрывать явно —
+        async with contextlib.aclosing(sdk.iter_homeworks()) as it: ... —
+        иначе подкачка отменится только при сборке генератора (или в close()).
+        """
+        def fetch(page: int):
+            url = self.base_url + MyStatSDK.EP_HW_PAGE.format(status=status, limit=page_size, page=page)
+            task = asyncio.ensure_future(self._get(url, use_cache=False))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return task
+
+        page = 1
+        pending = fetch(page)
+        seen = set()  # id уже отданных ДЗ
+        try:
+            while True:
+                data = await pending
+                items = HomeworkList.parse_items(data)
+                if MyStatSDK._page_repeats(items, seen):
+                    logger.warning("История ДЗ: страница %d повторяет уже полученные — обход остановлен", page)
+                    return
+                has_next = MyStatSDK._has_next_page(data, page, page_size, len(items))
+                if has_next:
+                    pending = fetch(page + 1)
+                for hw in items:
+                    yield hw
+                if not has_next:
+                    return
+                page += 1
+        finally:
+            if not pending.done():
+                pending.cancel()
+
+    async def get_attendance(self) -> str:
+        """Возвращает строку вида '92.3%' (месячная посещаемость)."""
+        return MyStatSDK._parse_attendance(await self._get(self.base_url + MyStatSDK.EP_ATTENDANCE))
+
+    async def get_schedule(self, date_filter: str = "2025-09-15") -> List[str]:
+        """Получить расписание недели, отсортированное по дате (по возрастанию)."""
+        url = self.base_url + MyStatSDK.EP_SCHEDULE.format(date_filter=date_filter)
+        return MyStatSDK._parse_schedule(await self._get(url))
+
+    async def upls_fs(self):
+        return await self._get(self.base_url + MyStatSDK.EP_FILE_TOKEN)
+
+    # ---------------- files ----------------
+
+    async def upload_to_fs(self, file_path: str, directory: str = None) -> str:
+        """Загружает файл на файловый сервер ITStep и возвращает URL"""
+        if not file_path or not os.path.exists(file_path):
+            raise FileNotFoundError(f"Файл '{file_path}' не найден")
+
+        fs_info = await self.upls_fs()
+        token = fs_info["token"]
+        if directory is None:
+            directory = fs_info["directories"]["homeworkDirId"]
+
+        headers = {"Authorization": f"Bearer {token}"}
+        errors = []
+        for base in self.FS_HOSTS:
+            url = f"{base}/api/v1/files"
+            try:
+                with open(file_path, "rb") as f:
+                    form = aiohttp.FormData()
+                    form.add_field("directory", str(directory))
+                    form.add_field("files[]", f, filename=os.path.basename(file_path))
+                    async with self._session().post(
+                        url, headers=headers, data=form, proxy=self.proxy,
+                        timeout=aiohttp.ClientTimeout(total=40),
+                    ) as r:
+                        if r.status == 200:
+                            link = MyStatSDK._parse_fs_link(await r.json(content_type=None))
+                            if link:
+                                return link
+                        errors.append(f"{url} — HTTP {r.status}: {(await r.text())[:200]}")
+            except Exception as e:
+                errors.append(f"{url} — {e}")
+
+        raise RuntimeError("FS upload failed. Tried:\n" + "\n".join(errors))
+
+    async def upload_homework(self, homework_id: int, file_path: str, comment: str = "") -> bool:
+        """Загружает ДЗ с файлом: сначала на FS, потом отправляет ссылку в MyStat"""
+        if not file_path or not os.path.exists(file_path):
+            logger.error("Файл не выбран или не существует")
+            return False
+
+        try:
+            file_url = await self.upload_to_fs(file_path)
+            payload = {"answerText": comment, "filename": file_url, "id": homework_id}
+            async with self._session().post(
+                self.base_url + MyStatSDK.EP_HW_CREATE,
+                headers=self._headers(), json=payload, proxy=self.proxy,
+                timeout=aiohttp.ClientTimeout(total=60),
+            ) as r:
+                if r.status in (200, 201):
+                    logger.info("ДЗ %s успешно отправлено: %s", homework_id, file_url)
+                    return True
+                logger.error("Ошибка при создании ДЗ: %s — %s", r.status, await r.text())
+                return False
+        except Exception as e:
+            logger.exception("Ошибка при загрузке ДЗ: %s", e)
+            return False
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    async def _demo():
+        async with AsyncMyStatSDK("login", "password") as sdk:
+            grades, avg, leaders = await asyncio.gather(
+                sdk.get_grades(), sdk.get_average_score(), sdk.get_leaderboard()
+            )
+            print(grades, avg, leaders)
+
+    asyncio.run(_demo())
@@ -0,0 +1,329 @@
+""" Набор бенчмарков MyStatSDK и дашборда против локального стенда (mock_server).
+
+    Сценарии:
+      refresh  — холодное (новый SDK: логин, пустые кеши, новые соединения) и тёплое
+                 (как кнопка «Обновить»: сброс REFRESH_INVALIDATE) обновление
+                 MyStatApp._fetch_data, плюс загрузка месяца расписания (get_month_lessons);
+      download — пропускная способность download_homeworks (параллельное скачивание вложений);
+      upload   — пропускная способность upload_to_fs (потоковый multipart);
+      scale    — рост времени с размером данных: история ДЗ (iter_homeworks + HomeworkList)
+                 и число недель расписания;
+      startup  — холодный запуск MyStatApp в отдельном процессе (offscreen): отметки
+                 StartupTimer от импорта main.py до первых и полных данных.
+
+    Результат — JSON (--json в stdout или --out в файл) для отслеживания регрессий;
+    --compare старый.json печатает изменения медиан и завершает с кодом 1,
+    если что-то замедлилось больше, чем на --threshold.
+
+    Запуск: python bench.py [refresh download upload scale] [--iterations 5] [--latency 0.01] [--out bench.json]
+    """
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, Any, List, Callable
+
+from core import FetchPlanner, HomeworkList
+from mock_server import MockMyStatServer
+
+SCENARIOS = ("refresh", "download", "upload", "scale", "startup")
+HOMEWORK_SIZES = (100, 1000, 10000)
+SCHEDULE_WEEKS = (8, 26, 52)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Сводка по замерам в секундах → миллисекунды."""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "n": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 2),
+        "median_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 2),
+    }
+
+
+def timeit(fn: Callable[[], Any], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def _dashboard(sdk):
+    """
+    Объект, на котором можно вызвать MyStatApp._fetch_data без окна:
+    метод читает только sdk, fetch_planner, SECTIONS и SECTION_SOURCES.
+    """
+    from main import MyStatApp  # PyQt5 нужен только этому сценарию
+
+    holder = SimpleNamespace(
+        sdk=sdk, fetch_planner=FetchPlanner(),
+        SECTIONS=MyStatApp.SECTIONS, SECTION_SOURCES=MyStatApp.SECTION_SOURCES,
+    )
+    return holder, MyStatApp
+
+
+def bench_refresh(server: MockMyStatServer, iterations: int) -> Dict[str, Any]:
+    def cold():
+        sdk = server.make_sdk()
+        holder, app_cls = _dashboard(sdk)
+        app_cls._fetch_data(holder)
+        sdk.close()
+
+    server.reset_stats()
+    cold_samples = timeit(cold, iterations)
+    cold_stats = server.stats()
+
+    sdk = server.make_sdk()
+    holder, app_cls = _dashboard(sdk)
+    app_cls._fetch_data(holder)  # прогрев: логин, соединения, кеш
+
+    def warm():
+        for name in app_cls.REFRESH_INVALIDATE:
+            sdk.invalidate(getattr(sdk, name))
+        app_cls._fetch_data(holder)
+
+    server.reset_stats()
+    warm_samples = timeit(warm, iterations)
+    warm_stats = server.stats()
+
+    today = datetime.now()
+
+    def month():
+        sdk.clear_cache()
+        sdk.get_month_lessons(today.year, today.month)
+
+    server.reset_stats()
+    month_samples = timeit(month, iterations)
+    month_stats = server.stats()
+    sdk.close()
+    return {
+        "cold": {**summarize(cold_samples), "requests_per_refresh": sum(cold_stats["requests"].values()) / iterations},
+        "warm": {**summarize(warm_samples), "requests_per_refresh": sum(warm_stats["requests"].values()) / iterations},
+        "month": {**summarize(month_samples), "requests": sum(month_stats["requests"].values()) / iterations},
+    }
+
+
+def bench_download(server: MockMyStatServer, iterations: int, files: int = 20) -> Dict[str, Any]:
+    start = (datetime.now() - timedelta(days=files - 1)).strftime("%Y-%m-%d")
+    end = datetime.now().strftime("%Y-%m-%d")
+    sdk = server.make_sdk()
+    samples, sizes = [], []
+    for _ in range(iterations):
+        folder = tempfile.mkdtemp(prefix="mystat-bench-dl-")
+        try:
+            t0 = time.perf_counter()
+            saved = sdk.download_homeworks(start, end, folder)
+            samples.append(time.perf_counter() - t0)
+            sizes.append(sum(os.path.getsize(p) for p in saved))
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    sdk.close()
+    total = sum(sizes)
+    return {
+        **summarize(samples),
+        "files": files,
+        "bytes": sizes[-1] if sizes else 0,
+        "mb_per_s": round(total / sum(samples) / 1e6, 2) if samples else 0.0,
+    }
+
+
+def bench_upload(server: MockMyStatServer, iterations: int, size: int = 8 * 1024 * 1024) -> Dict[str, Any]:
+    tmp = tempfile.mkdtemp(prefix="mystat-bench-up-")
+    path = os.path.join(tmp, "answer.bin")
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    sdk = server.make_sdk()
+    try:
+        samples = timeit(lambda: sdk.upload_to_fs(path), iterations)
+    finally:
+        sdk.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return {**summarize(samples), "bytes": size, "mb_per_s": round(size * len(samples) / sum(samples) / 1e6, 2)}
+
+
+def bench_scale(latency: float, iterations: int) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"homeworks": {}, "schedule_weeks": {}}
+    for n in HOMEWORK_SIZES:
+        with MockMyStatServer(latency=latency, homeworks=n) as server:
+            sdk = server.make_sdk()
+            sdk.ensure_token()
+            samples = timeit(lambda: HomeworkList(list(sdk.iter_homeworks())), iterations)
+            out["homeworks"][str(n)] = summarize(samples)
+            sdk.close()
+
+    with MockMyStatServer(latency=latency) as server:
+        sdk = server.make_sdk()
+        sdk.ensure_token()
+        monday = datetime.now() - timedelta(days=datetime.now().weekday())
+        for weeks in SCHEDULE_WEEKS:
+            tasks = {
+                f"schedule:{i}": (lambda w=(monday + timedelta(weeks=i)).strftime("%Y-%m-%d"): sdk.get_lessons(w))
+                for i in range(weeks)
+            }
+
+            def run():
+                sdk.clear_cache()
+                FetchPlanner().run(tasks)
+
+            out["schedule_weeks"][str(weeks)] = summarize(timeit(run, iterations))
+        sdk.close()
+    return out
+
+
+# запускается в дочернем процессе: чистый интерпретатор, как при двойном клике по приложению
+_STARTUP_SCRIPT = """
+import time
+t0 = time.perf_counter()
+import json, os, sys
+import main
+startup = main.StartupTimer(t0)
+startup.mark("imports")
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
+app = QApplication(sys.argv)
+
+def factory():
+    from core import MyStatSDK
+    from ratelimit import RateLimiter
+    sdk = MyStatSDK("student", "secret", base_url=os.environ["MYSTAT_BENCH_URL"], rate_limiter=RateLimiter(1e6, 1e6))
+    sdk.http.trust_env = False
+    return sdk
+
+window = main.MyStatApp(sdk_factory=factory, startup=startup)
+window.show()
+
+def poll():
+    if "data_loaded" in startup.marks:
+        print(json.dumps(startup.marks))
+        app.quit()
+
+timer = QTimer()
+timer.timeout.connect(poll)
+timer.start(5)
+QTimer.singleShot(15000, app.quit)
+app.exec_()
+"""
+
+
+def bench_startup(server: MockMyStatServer, iterations: int) -> Dict[str, Any]:
+    env = dict(os.environ, MYSTAT_BENCH_URL=server.api_url, QT_QPA_PLATFORM="offscreen")
+    here = os.path.dirname(os.path.abspath(__file__))
+    marks: Dict[str, List[float]] = {}
+    for _ in range(iterations):
+        out = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT], cwd=here, env=env,
+            capture_output=True, text=True, timeout=60,
+        ).stdout.strip().splitlines()
+        if not out:
+            continue
+        for name, ms in json.loads(out[-1]).items():
+            marks.setdefault(name, []).append(ms / 1000)
+    return {name: summarize(samples) for name, samples in marks.items()}
+
+
+def run(scenarios=SCENARIOS, iterations: int = 5, latency: float = 0.01, error_rate: float = 0.0) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "latency_s": latency,
+            "error_rate": error_rate,
+        },
+    }
+    if any(s in scenarios for s in ("refresh", "download", "upload", "startup")):
+        with MockMyStatServer(latency=latency, error_rate=error_rate) as server:
+            if "refresh" in scenarios:
+                results["refresh"] = bench_refresh(server, iterations)
+            if "download" in scenarios:
+                results["download"] = bench_download(server, iterations)
+            if "upload" in scenarios:
+                results["upload"] = bench_upload(server, iterations)
+            if "startup" in scenarios:
+                results["startup"] = bench_startup(server, iterations)
+    if "scale" in scenarios:
+        results["scale"] = bench_scale(latency, iterations)
+    return results
+
+
+def _medians(node: Any, prefix: str = "") -> Dict[str, float]:
+    """Плоский словарь {путь.к.замеру: median_ms} из результата run()."""
+    found = {}
+    if isinstance(node, dict):
+        if "median_ms" in node:
+            found[prefix] = node["median_ms"]
+        for k, v in node.items():
+            if k != "meta":
+                found.update(_medians(v, f"{prefix}.{k}" if prefix else k))
+    return found
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> List[str]:
+    """Печатает изменение медиан; возвращает замеры, замедлившиеся больше чем на threshold (доля)."""
+    before, after = _medians(old), _medians(new)
+    regressed = []
+    for key in sorted(after):
+        if key not in before or not before[key]:
+            continue
+        change = after[key] / before[key] - 1
+        mark = ""
+        if change > threshold:
+            regressed.append(key)
+            mark = "  <-- регрессия"
+        print(f"{key:<32} {before[key]:9.2f} → {after[key]:9.2f} мс ({change:+.0%}){mark}")
+    return regressed
+
+
+def _print_text(results: Dict[str, Any]) -> None:
+    for key, median in _medians(results).items():
+        print(f"{key:<32} {median:9.2f} мс (медиана)")
+    for name in ("download", "upload"):
+        if name in results:
+            print(f"{name + ' throughput':<32} {results[name]['mb_per_s']:9.2f} МБ/с")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("scenarios", nargs="*", help="какие сценарии гонять: " + ", ".join(SCENARIOS) + " (по умолчанию все)")
+    p.add_argument("--iterations", type=int, default=5)
+    p.add_argument("--latency", type=float, default=0.01, help="задержка ответа стенда, сек")
+    p.add_argument("--error-rate", type=float, default=0.0, help="доля GET с ошибкой 503")
+    p.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    p.add_argument("--out", help="записать результат в JSON-файл")
+    p.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    p.add_argument("--threshold", type=float, default=0.2, help="допустимое замедление медианы (доля)")
+    p.add_argument("-v", "--verbose", action="store_true", help="логи SDK")
+    args = p.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        p.error("неизвестные сценарии: " + ", ".join(sorted(unknown)))
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s: %(message)s")
+
+    res = run(tuple(args.scenarios or SCENARIOS), args.iterations, args.latency, args.error_rate)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=2, ensure_ascii=False)
+    if args.json:
+        print(json.dumps(res, indent=2, ensure_ascii=False))
+    elif not args.compare:
+        _print_text(res)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressed = compare(json.load(f), res, args.threshold)
+        sys.exit(1 if regressed else 0)
@@ -0,0 +1,92 @@
+""" Бенчмарк пула соединений MyStatSDK.
+
+    Поднимает локальный HTTPS-стенд (mock_server.MockMyStatServer с tls=True),
+    прогоняет одно и то же «обновление дашборда» (login + 8 недель расписания +
+    5 эндпоинтов — прежний набор запросов дашборда, до помесячной загрузки
+    расписания) в двух режимах:
+      before — каждый вызов через голый requests.get/post (как было раньше);
+      after  — общий keep-alive пул MyStatSDK.http.
+    Считает TLS-рукопожатия на стороне сервера и общее время.
+
+    Запуск: python bench_pool.py [--refreshes 5] [--latency 0.0] [--json]
+    """
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import requests
+
+from core import MyStatSDK
+from mock_server import MockMyStatServer
+
+class _OneShotHTTP:
+    """Поведение до пула: каждый вызов — новое TCP+TLS соединение."""
+
+    def __init__(self, verify):
+        self.verify = verify
+
+    def get(self, url, **kw):
+        return requests.get(url, verify=self.verify, **kw)
+
+    def post(self, url, **kw):
+        return requests.post(url, verify=self.verify, **kw)
+
+    def close(self):
+        pass
+
+
+def _refresh(sdk: MyStatSDK) -> None:
+    """Одно обновление дашборда — фиксированный набор вызовов, чтобы замеры были сравнимы между версиями."""
+    sdk.clear_cache()
+    start = datetime.now() - timedelta(days=datetime.now().weekday())
+    for i in range(8):
+        sdk.get_schedule((start + timedelta(weeks=i)).strftime("%Y-%m-%d"))
+    sdk.get_homework()
+    sdk.get_homeworks_list()
+    sdk.get_average_score()
+    sdk.get_leaderboard()
+    sdk.get_attendance()
+
+
+def run(refreshes: int = 5, latency: float = 0.0) -> dict:
+    results = {}
+    with MockMyStatServer(latency=latency, tls=True) as server:
+        for mode in ("before", "after"):
+            server.reset_stats()
+            sdk = server.make_sdk("bench", "bench")
+            if mode == "before":
+                sdk.http = _OneShotHTTP(server.cert_path)
+            t0 = time.perf_counter()
+            for _ in range(refreshes):
+                sdk.session_token = None  # каждый прогон — с логином, как при запуске
+                _refresh(sdk)
+            elapsed = time.perf_counter() - t0
+            sdk.close()
+            results[mode] = {
+                "refreshes": refreshes,
+                "handshakes": server.handshakes,
+                "handshakes_per_refresh": server.handshakes / refreshes,
+                "wall_s": round(elapsed, 4),
+                "ms_per_refresh": round(elapsed * 1000 / refreshes, 2),
+            }
+    return results
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--refreshes", type=int, default=5)
+    p.add_argument("--latency", type=float, default=0.0, help="искусственная задержка ответа сервера, сек")
+    p.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    args = p.parse_args()
+
+    res = run(args.refreshes, args.latency)
+    if args.json:
+        print(json.dumps(res, indent=2))
+    else:
+        for mode, r in res.items():
+            print(
+                f"{mode:>6}: {r['handshakes']:>3} рукопожатий "
+                f"({r['handshakes_per_refresh']:.1f}/обновление), "
+                f"{r['wall_s']:.3f} c, {r['ms_per_refresh']:.1f} мс/обновление"
+            )
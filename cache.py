@@ -0,0 +1,238 @@
+""" Кеши ответов MyStat API.
+
+    MemoryCache — быстрый кеш в памяти процесса: LRU-вытеснение, TTL на запись,
+    ограничение по числу записей и байтам, сброс по префиксу URL и счётчики
+    попаданий/промахов/вытеснений.
+
+    DiskCache — постоянный кеш на SQLite: переживает перезапуск приложения,
+    у каждой записи свой срок жизни (TTL), общий размер ограничен, старые
+    записи вытесняются по времени последнего обращения. Смена версии схемы
+    (VERSION) сбрасывает весь кеш.
+    """
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Any, Tuple, Dict
+
+logger = logging.getLogger("MyStatSDK")
+
+
+class MemoryCache:
+    MAX_ENTRIES = 512
+    MAX_BYTES = 8 * 1024 * 1024  # 8 МБ
+    DEFAULT_TTL = 600
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None, default_ttl: Optional[float] = None):
+        """
+        :param max_entries: максимум записей
+        :param max_bytes: предел суммарного размера (по длине ответа сервера)
+        :param default_ttl: TTL для set() без явного ttl
+        """
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self.default_ttl = self.DEFAULT_TTL if default_ttl is None else default_ttl
+        # key -> (value, size, expires_at); порядок = порядок использования (конец — самый свежий)
+        self._data: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and item[2] >= time.time()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Значение по ключу или None (нет записи / истёк TTL)."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if item[2] < time.time():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, size: Optional[int] = None) -> None:
+        """
+        Кладёт значение в кеш.
+        :param ttl: срок жизни в секундах (по умолчанию default_ttl); <= 0 — не кешировать
+        :param size: размер в байтах; если не передан — длина JSON-представления
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        if size is None:
+            size = len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, size, time.time() + ttl)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Удаляет все записи, ключ которых начинается с prefix. Возвращает число удалённых."""
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(prefix)]
+            for k in keys:
+                self._drop(k)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики кеша: попадания, промахи, вытеснения, истечения, размер."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._data),
+            "bytes": self._bytes,
+        }
+
+
+class DiskCache:
+    VERSION = 1  # увеличить, если меняется формат хранимых данных
+    MAX_BYTES = 20 * 1024 * 1024  # 20 МБ на весь кеш
+    DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".mystat", "cache.sqlite3")
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None, version: Optional[int] = None):
+        """
+        :param path: файл базы (по умолчанию ~/.mystat/cache.sqlite3); ':memory:' — без диска
+        :param max_bytes: предел суммарного размера значений
+        :param version: версия данных; при несовпадении с сохранённой кеш очищается
+        """
+        self.path = path or self.DEFAULT_PATH
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self.version = self.VERSION if version is None else version
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # SDK дёргает кеш из потоков FetchPlanner, поэтому одно соединение под замком
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+        """)
+        self._check_version()
+
+    def _check_version(self) -> None:
+        with self._lock, self._db:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != str(self.version):
+                if row is not None:
+                    logger.info("Кеш: версия %s → %s, очищаю", row[0], self.version)
+                self._db.execute("DELETE FROM entries")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(self.version),))
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[Any]:
+        """Значение по ключу или None (нет записи / истёк TTL, если не allow_stale)."""
+        hit = self.get_with_age(key, allow_stale)
+        return hit[0] if hit else None
+
+    def get_with_age(self, key: str, allow_stale: bool = False) -> Optional[Tuple[Any, float, float]]:
+        """
+        (значение, возраст в секундах, сколько секунд записи осталось жить) или None.
+        Для просроченной записи (allow_stale) остаток отрицательный.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, stored_at, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, stored_at, expires_at = row
+            if expires_at < now and not allow_stale:
+                return None
+            with self._db:
+                self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value), now - stored_at, expires_at - now
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Сохраняет значение на ttl секунд; ttl <= 0 — не сохранять."""
+        if ttl <= 0:
+            return
+        raw = json.dumps(value, ensure_ascii=False)
+        size = len(raw.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, raw, size, now, now + ttl, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        # сначала выкидываем давно истёкшие, потом — самые давно читанные, пока не влезем в лимит
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM entries ORDER BY expires_at < ? DESC, accessed_at ASC", (time.time(),)
+        ).fetchall():
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Удаляет все записи, ключ которых начинается с prefix. Возвращает число удалённых."""
+        with self._lock, self._db:
+            cur = self._db.execute("DELETE FROM entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+            return cur.rowcount
+
+    def clear(self) -> None:
+        """Полностью очищает кеш."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM entries")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,230 @@
+""" Пакетный сбор данных по многим аккаунтам MyStat без UI.
+
+    Читает файл аккаунтов и по каждому собирает оценки, средний балл, посещаемость,
+    счётчики ДЗ и лидерборд; результат пишется в JSONL построчно, по мере готовности
+    (порядок строк — порядок завершения, не порядок в файле).
+
+    Формат файла аккаунтов: по строке на аккаунт — «логин:пароль» или «логин<TAB>пароль»,
+    либо JSON-объект {"username": ..., "password": ...}; пустые строки и # — пропускаются.
+
+    У каждого аккаунта свой MyStatSDK — свой токен, кеш в памяти и requests.Session (cookies
+    аккаунтов не смешиваются), — но пул соединений (HTTPAdapter, смонтированный во все сессии),
+    RateLimiter и Metrics общие на весь прогон. Поле, запрос за которым не удался, попадает
+    в errors записи, а не в данные значением по умолчанию; ok — все поля получены. Одновременно
+    обрабатывается не больше --concurrency аккаунтов, поэтому время прогона растёт как
+    число аккаунтов / concurrency (пока не упрётся в общий --rate запросов в секунду).
+
+    Запуск: python collector.py accounts.txt [-o out.jsonl] [--concurrency 8] [--rate 10]
+    """
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Any, Iterable, Iterator, Tuple, Callable, TextIO
+
+from requests.adapters import HTTPAdapter
+
+from core import MyStatSDK, UpstreamError
+from metrics import Metrics
+from ratelimit import RateLimiter
+
+logger = logging.getLogger("MyStatSDK")
+
+# что собирать: поле в JSONL -> как получить из SDK
+FIELDS: Dict[str, Callable[[MyStatSDK], Any]] = {
+    "grades": lambda sdk: sdk.get_grades(),
+    "average": lambda sdk: sdk.get_average_score(),
+    "attendance": lambda sdk: sdk.get_attendance(),
+    "homework": lambda sdk: dict(zip(("done", "overdue"), sdk.get_homework())),
+    "leaderboard": lambda sdk: sdk.get_leaderboard(),
+}
+
+
+def parse_accounts(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """(логин, пароль) из строк файла аккаунтов; кривые строки пропускаются с предупреждением."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            try:
+                item = json.loads(line)
+                yield str(item["username"]), str(item["password"])
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Аккаунты, строка %d: не удалось разобрать JSON", number)
+            continue
+        sep = "\t" if "\t" in line else ":"
+        username, found, password = line.partition(sep)
+        if not found or not username:
+            logger.warning("Аккаунты, строка %d: ожидается логин:пароль", number)
+            continue
+        yield username.strip(), password
+
+
+class BatchCollector:
+    MAX_PENDING_FACTOR = 2  # сколько аккаунтов держать в очереди на одного работника (файл читается потоково)
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        base_url: Optional[str] = None,
+        proxies: Dict[str, str] = None,
+        adapter: Optional[HTTPAdapter] = None,
+        trust_env: bool = True,
+        fields: Optional[Iterable[str]] = None,
+    ):
+        """
+        :param concurrency: сколько аккаунтов обрабатывать одновременно
+        :param rate: общий лимит запросов в секунду на весь прогон (по умолчанию RateLimiter.DEFAULT_RATE)
+        :param burst: общий размер залпа
+        :param base_url: корень API (по умолчанию MyStatSDK.BASE_URL)
+        :param proxies: прокси для всех аккаунтов
+        :param adapter: общий пул соединений для сессий аккаунтов; если None — создаётся под concurrency
+        :param trust_env: брать прокси и сертификаты из окружения (requests.Session.trust_env)
+        :param fields: какие поля собирать (ключи FIELDS; по умолчанию все)
+        """
+        self.concurrency = max(1, concurrency)
+        self.base_url = base_url
+        self.proxies = proxies
+        self.fields = list(fields or FIELDS)
+        unknown = set(self.fields) - set(FIELDS)
+        if unknown:
+            raise ValueError("неизвестные поля: " + ", ".join(sorted(unknown)))
+        self.trust_env = trust_env
+        self._owns_adapter = adapter is None
+        self.adapter = adapter or MyStatSDK.make_adapter(pool_maxsize=max(MyStatSDK.POOL_MAXSIZE, self.concurrency))
+        # лимиты MyStatSDK.RATE_LIMITS рассчитаны на одного пользователя (пауза между его логинами),
+        # здесь каждый аккаунт логинится один раз — ограничиваем только общий поток
+        self.rate_limiter = RateLimiter(rate, burst)
+        self.metrics = Metrics()
+
+    def close(self) -> None:
+        if self._owns_adapter:
+            self.adapter.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def make_sdk(self, username: str, password: str) -> MyStatSDK:
+        """SDK одного аккаунта: своя сессия поверх общего пула, общие лимитер и метрики."""
+        # сессию не закрываем: Session.close() закрыл бы и общий адаптер
+        http = MyStatSDK.make_session(adapter=self.adapter)
+        http.trust_env = self.trust_env
+        sdk = MyStatSDK(
+            username, password,
+            proxies=self.proxies,
+            session=http,
+            base_url=self.base_url,
+            rate_limiter=self.rate_limiter,
+            metrics=self.metrics,
+        )
+        sdk.AUTO_REFRESH_TOKEN = False  # прогон короче жизни токена — фоновые таймеры не нужны
+        return sdk
+
+    def collect_one(self, username: str, password: str) -> Dict[str, Any]:
+        """
+        Все поля одного аккаунта. Ошибки не пробрасываются — попадают в запись: поле
+        собирается в sdk.strict(), так что неудавшийся запрос — ошибка поля, а не "0%" или [].
+        """
+        t0 = time.perf_counter()
+        record: Dict[str, Any] = {"username": username, "ok": False}
+        sdk = self.make_sdk(username, password)
+        try:
+            if not sdk.ensure_token():
+                record["error"] = "не удалось войти"
+                return record
+            errors = {}
+            for name in self.fields:
+                try:
+                    with sdk.strict():
+                        record[name] = FIELDS[name](sdk)
+                except UpstreamError as e:
+                    errors[name] = str(e)
+                except Exception as e:
+                    logger.warning("%s: не удалось получить %s: %s", username, name, e)
+                    errors[name] = str(e)
+            if errors:
+                record["errors"] = errors
+            record["ok"] = not errors
+            return record
+        finally:
+            sdk.close()
+            record["elapsed"] = round(time.perf_counter() - t0, 3)
+
+    def run(self, accounts: Iterable[Tuple[str, str]], out: TextIO) -> Dict[str, int]:
+        """
+        Обрабатывает аккаунты и пишет по JSON-строке на каждый в out сразу по готовности.
+        :return: {"accounts": ..., "ok": ..., "failed": ...}
+        """
+        summary = {"accounts": 0, "ok": 0, "failed": 0}
+        max_pending = self.concurrency * self.MAX_PENDING_FACTOR
+        accounts = iter(accounts)
+
+        def drain(done) -> None:
+            for future in done:
+                record = future.result()
+                summary["ok" if record["ok"] else "failed"] += 1
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="mystat-batch") as ex:
+            pending = set()
+            for username, password in accounts:
+                summary["accounts"] += 1
+                pending.add(ex.submit(self.collect_one, username, password))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    drain(done)
+            drain(wait(pending).done)
+        return summary
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("accounts", help="файл аккаунтов ('-' — stdin)")
+    p.add_argument("-o", "--out", help="куда писать JSONL (по умолчанию stdout)")
+    p.add_argument("--concurrency", type=int, default=8, help="аккаунтов одновременно")
+    p.add_argument("--rate", type=float, default=None, help="общий лимит запросов в секунду")
+    p.add_argument("--burst", type=float, default=None, help="общий размер залпа")
+    p.add_argument("--base-url", default=None, help="корень API (по умолчанию " + MyStatSDK.BASE_URL + ")")
+    p.add_argument("--fields", default=",".join(FIELDS), help="что собирать, через запятую: " + ", ".join(FIELDS))
+    p.add_argument("-v", "--verbose", action="store_true", help="логи SDK и сводка метрик")
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s: %(message)s")
+
+    try:
+        collector = BatchCollector(
+            concurrency=args.concurrency, rate=args.rate, burst=args.burst,
+            base_url=args.base_url, fields=[f.strip() for f in args.fields.split(",") if f.strip()],
+        )
+    except ValueError as e:
+        p.error(str(e))
+
+    src = sys.stdin if args.accounts == "-" else open(args.accounts, encoding="utf-8")
+    dst = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    t0 = time.perf_counter()
+    try:
+        with collector:
+            summary = collector.run(parse_accounts(src), dst)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    elapsed = time.perf_counter() - t0
+    print(
+        f"Аккаунтов: {summary['accounts']}, успешно {summary['ok']}, с ошибками {summary['failed']} "
+        f"за {elapsed:.1f} c",
+        file=sys.stderr,
+    )
+    if args.verbose:
+        print(collector.metrics.report(), file=sys.stderr)
+    sys.exit(1 if summary["failed"] else 0)
@@ -4,34 +4,190 @@
     """
 import time
 import requests
+from requests.adapters import HTTPAdapter
 import logging
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, ExitStack
+from typing import Optional, List, Dict, Any, Callable, Iterator, Iterable
+from datetime import datetime, timedelta, date as date_cls, time as time_cls
 from typing import List
 import os
+import glob
+import uuid
+from urllib.parse import urlsplit
 
+from cache import MemoryCache
+from metrics import Metrics
+from ratelimit import RateLimiter, RetryPolicy, parse_retry_after
+
+# обработчики логов настраивает приложение (см. __main__), импорт SDK их не трогает
 logger = logging.getLogger("MyStatSDK")
-logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
 
 class MyStatSDK:
+    BASE_URL = "https://mapi.itstep.org/v1/mystat"
     TOKEN_LIFETIME = 7200  # 2 часа — время жизни токена
-    pause = 0.5  # задержка между запросами
+    TOKEN_REFRESH_MARGIN = 300  # за сколько секунд до истечения обновлять токен в фоне
+    AUTO_REFRESH_TOKEN = True  # False — без фонового таймера (токен обновится при первом запросе после истечения)
+    pause = 0.5  # минимальный интервал между логинами (см. RATE_LIMITS)
     REQUEST_TIMEOUT = 8  # seconds
-
-    def __init__(self, username: str, password: str, proxies: Dict[str, str] = None):
+    DOWNLOAD_TIMEOUT = 10  # seconds, между байтами при скачивании файлов
+    DOWNLOAD_CHUNK_SIZE = 64 * 1024  # размер куска при записи скачиваемого файла
+    DOWNLOAD_WORKERS = 4  # параллельных скачиваний в download_homeworks
+    # общий на SDK пул для недель get_month_lessons (сколько месяцев ни грузится одновременно);
+    # вместе с FetchPlanner.MAX_WORKERS не больше POOL_MAXSIZE, иначе пул соединений переполнится
+    MONTH_WORKERS = 4
+    FS_CONNECT_TIMEOUT = 3  # seconds — мёртвое зеркало FS отсеивается быстро
+    FS_UPLOAD_TIMEOUT = 40  # seconds — на саму передачу файла
+    FS_HEALTH_TTL = 7 * 86400  # сколько хранить статистику зеркал FS в disk_cache
+    UPLOAD_CHUNK_SIZE = 64 * 1024  # кусок потоковой отправки файла (и шаг progress-колбэка)
+    POOL_CONNECTIONS = 8  # сколько хостов держим в пуле (mapi + зеркала fs)
+    POOL_MAXSIZE = 10  # keep-alive соединений на один хост
+    POOL_BLOCK = False  # True — ждать свободное соединение вместо открытия лишнего
+    # пути эндпоинтов относительно base_url (общие для MyStatSDK и AsyncMyStatSDK)
+    EP_LOGIN = "/auth/login"
+    EP_GRADES = "/aqtobe/statistic/marks"
+    EP_PROGRESS = "/aqtobe/statistic/progress?period=year"
+    EP_LEADERS = "/aqtobe/progress/leader-table"
+    EP_HW_COUNT = "/aqtobe/count/homework"
+    EP_HW_LIST = "/aqtobe/homework/list?status=3&limit=100&sort=-hw.time"
+    EP_HW_PAGE = "/aqtobe/homework/list?status={status}&limit={limit}&page={page}&sort=-hw.time"
+    EP_ATTENDANCE = "/aqtobe/statistic/attendance?period=month"
+    EP_SCHEDULE = "/aqtobe/schedule/get-month?type=week&date_filter={date_filter}"
+    EP_HW_CREATE = "/aqtobe/homework/create"
+    EP_FILE_TOKEN = "/aqtobe/user/file-token"
+    ENDPOINTS = (
+        EP_LOGIN, EP_GRADES, EP_PROGRESS, EP_LEADERS, EP_HW_COUNT, EP_HW_LIST,
+        EP_ATTENDANCE, EP_SCHEDULE, EP_HW_CREATE, EP_FILE_TOKEN,
+    )
+    # дополнительные лимиты (запросов/сек, залп) поверх общего RateLimiter.DEFAULT_RATE
+    RATE_LIMITS = {
+        EP_LOGIN: (1 / pause, 1),  # не чаще раза в pause секунд, как раньше делал sleep в login()
+        EP_SCHEDULE: (5, 8),  # браузинг недель календаря
+    }
+    # TTL ответов в постоянном кеше (сек) по пути эндпоинта без query; 0 — не сохранять на диск
+    CACHE_TTLS = {
+        EP_GRADES: 3600,
+        EP_PROGRESS: 6 * 3600,
+        EP_LEADERS: 6 * 3600,
+        EP_HW_COUNT: 600,
+        EP_HW_LIST: 600,
+        EP_ATTENDANCE: 3600,
+        EP_SCHEDULE: 12 * 3600,
+        EP_FILE_TOKEN: 0,  # содержит токен FS — на диск не пишем
+    }
+    DEFAULT_CACHE_TTL = 600
+    # метки в Metrics для запросов к файловому серверу (у них нет EP_* пути)
+    METRIC_FS_UPLOAD = "fs:upload"
+    METRIC_FS_DOWNLOAD = "fs:download"
+    FS_HOSTS = [
+        "https://fsx3.itstep.org",
+        "https://fsx2.itstep.org",
+        "https://fsx1.itstep.org",
+        "https://fs3.itstep.org",
+        "https://fs2.itstep.org",
+        "https://fs1.itstep.org",
+    ]
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        proxies: Dict[str, str] = None,
+        session: Optional[requests.Session] = None,
+        pool_connections: Optional[int] = None,
+        pool_maxsize: Optional[int] = None,
+        base_url: Optional[str] = None,
+        disk_cache=None,
+        memory_cache: Optional[MemoryCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        metrics: Optional[Metrics] = None,
+    ):
         """
         Инициализация SDK:
         :param username: логин пользователя
         :param password: пароль пользователя
         :param proxies: словарь прокси, например {'http': 'http://...', 'https': 'https://...'}
+        :param session: готовая requests.Session (общий пул на несколько SDK); если None — создаётся своя
+        :param pool_connections: число пулов по хостам (по умолчанию POOL_CONNECTIONS)
+        :param pool_maxsize: лимит keep-alive соединений на хост (по умолчанию POOL_MAXSIZE)
+        :param base_url: корень API (по умолчанию BASE_URL; для локального стенда — свой адрес)
+        :param disk_cache: постоянный кеш (cache.DiskCache) — ответы переживают перезапуск, TTL по CACHE_TTLS
+        :param memory_cache: кеш в памяти (по умолчанию cache.MemoryCache с LRU и TTL)
+        :param rate_limiter: ограничитель частоты (можно один на несколько SDK); по умолчанию свой с RATE_LIMITS
+        :param retry_policy: повторы GET при 429/5xx/сетевых ошибках (по умолчанию RetryPolicy())
+        :param metrics: счётчики запросов и кеша (metrics.Metrics; можно один на несколько SDK)
         """
         self.username = username
         self.password = password
         self.proxies = proxies or {}
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
         self.session_token: Optional[str] = None
         self.token_time: float = 0.0
-        self._last_get_cache: Dict[str, Any] = {}
+        self.memory_cache = memory_cache if memory_cache is not None else MemoryCache()
+        self.disk_cache = disk_cache
+        self.rate_limiter = rate_limiter or RateLimiter(per_endpoint=self.RATE_LIMITS)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.metrics = metrics if metrics is not None else Metrics()
+        self._hw_view = None  # (ответ homework/list, построенный по нему HomeworkList)
+        self.fs_health = HostHealth(self.FS_HOSTS)
+        if disk_cache is not None:
+            self.fs_health.load(disk_cache.get(HostHealth.CACHE_KEY, allow_stale=True))
+        self._login_lock = threading.Lock()
+        self._refresh_timer: Optional[threading.Timer] = None
+        # одинаковые GET, идущие одновременно, схлопываются в один запрос (см. _get)
+        self._inflight: Dict[str, "_Flight"] = {}
+        self._inflight_lock = threading.Lock()
+        self.coalesce_stats = {"requests": 0, "coalesced": 0}
+        self._week_pool: Optional[ThreadPoolExecutor] = None  # создаётся при первом get_month_lessons
+        self._week_pool_lock = threading.Lock()
+        self._modes = threading.local()  # глубина вложенных strict()/revalidate() в текущем потоке
+        self._owns_http = session is None
+        self.http = session or self.make_session(
+            pool_connections or self.POOL_CONNECTIONS,
+            pool_maxsize or self.POOL_MAXSIZE,
+        )
+
+    @classmethod
+    def make_adapter(cls, pool_connections: int = None, pool_maxsize: int = None) -> HTTPAdapter:
+        """HTTPAdapter с keep-alive пулом; один адаптер можно смонтировать в несколько сессий."""
+        return HTTPAdapter(
+            pool_connections=pool_connections or cls.POOL_CONNECTIONS,
+            pool_maxsize=pool_maxsize or cls.POOL_MAXSIZE,
+            pool_block=cls.POOL_BLOCK,
+        )
+
+    @classmethod
+    def make_session(
+        cls, pool_connections: int = None, pool_maxsize: int = None, adapter: Optional[HTTPAdapter] = None
+    ) -> requests.Session:
+        """
+        Создаёт requests.Session с keep-alive пулом соединений.
+        Сессию можно передавать в несколько экземпляров SDK — urllib3-пул потокобезопасен.
+        :param adapter: готовый адаптер (общий пул у сессий с разными cookies); если None — новый
+        """
+        adapter = adapter or cls.make_adapter(pool_connections, pool_maxsize)
+        s = requests.Session()
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+        return s
+
+    def close(self) -> None:
+        """Останавливает фоновое обновление токена и закрывает пул соединений (если сессия создана самим SDK)."""
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        if self._week_pool is not None:
+            self._week_pool.shutdown(wait=False)
+        if self._owns_http:
+            self.http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def login(self) -> bool:
         """
@@ -39,26 +195,32 @@ class MyStatSDK:
         Получает Bearer токен и сохраняет время получения.
         Возвращает True при успехе.
         """
-        time.sleep(self.pause)
-        url = "https://mapi.itstep.org/v1/mystat/auth/login"
+        self.rate_limiter.acquire(self.EP_LOGIN)
+        url = self.base_url + self.EP_LOGIN
+        t0 = time.perf_counter()
         try:
-            r = requests.post(
+            r = self.http.post(
                 url,
                 json={"login": self.username, "password": self.password},
                 proxies=self.proxies,
                 timeout=self.REQUEST_TIMEOUT,
             )
-            if r.status_code == 200:
-                # Токен приходит в теле как строка "...", поэтому strip('"')
-                self.session_token = r.text.strip('"')
-                self.token_time = time.time()
-                logger.info("Токен успешно получен.")
-                return True
-            logger.error("Ошибка авторизации: %s — %s", r.status_code, r.text)
-            return False
         except requests.RequestException as e:
+            self.metrics.record_request(self.EP_LOGIN, time.perf_counter() - t0, None)
+            self.metrics.record_login(False, time.perf_counter() - t0)
             logger.exception("Ошибка при авторизации: %s", e)
             return False
+        elapsed = time.perf_counter() - t0
+        self.metrics.record_request(self.EP_LOGIN, elapsed, r.status_code, len(r.content), len(r.request.body or b""))
+        self.metrics.record_login(r.status_code == 200, elapsed)
+        if r.status_code == 200:
+            self.session_token = self._parse_token(r.text)
+            self.token_time = time.time()
+            logger.info("Токен успешно получен.")
+            self._schedule_refresh()
+            return True
+        logger.error("Ошибка авторизации: %s — %s", r.status_code, r.text)
+        return False
 
     def _headers(self) -> Dict[str, str]:
         """Возвращает заголовки для авторизации."""
@@ -68,30 +230,195 @@ class MyStatSDK:
         """Проверяет, действителен ли текущий токен (по времени)."""
         return bool(self.session_token) and (time.time() - self.token_time < self.TOKEN_LIFETIME)
 
+    def ensure_token(self) -> bool:
+        """Логинится, если токена нет или он истёк. Параллельные вызовы ждут один логин."""
+        if self._is_token_valid():
+            return True
+        with self._login_lock:
+            return self._is_token_valid() or self.login()
+
+    def _refresh_token(self, stale_token: Optional[str]) -> bool:
+        """
+        Перелогин взамен stale_token (истекает или сервер ответил 401).
+        Single-flight: если пока ждали замок другой поток уже сменил токен — логина не будет.
+        """
+        with self._login_lock:
+            if self.session_token != stale_token and self._is_token_valid():
+                return True
+            return self.login()
+
+    def _schedule_refresh(self) -> None:
+        """Ставит фоновое обновление токена за TOKEN_REFRESH_MARGIN до истечения."""
+        if not self.AUTO_REFRESH_TOKEN:
+            return
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        delay = max(self.TOKEN_LIFETIME - self.TOKEN_REFRESH_MARGIN, 1)
+        timer = threading.Timer(delay, self._refresh_token, args=(self.session_token,))
+        timer.daemon = True
+        timer.start()
+        self._refresh_timer = timer
+
+    def _endpoint_of(self, url: str) -> Optional[str]:
+        """EP_* константа, к которой относится URL (по самому длинному совпавшему пути), или None."""
+        path = url[len(self.base_url):].split("?", 1)[0]
+        best = None
+        for ep in self.ENDPOINTS:
+            ep_path = ep.split("?", 1)[0]
+            if path.startswith(ep_path) and (best is None or len(ep_path) > len(best.split("?", 1)[0])):
+                best = ep
+        return best
+
+    def _cache_ttl(self, url: str) -> float:
+        """TTL кеша для URL — из CACHE_TTLS по эндпоинту, иначе DEFAULT_CACHE_TTL."""
+        return self.CACHE_TTLS.get(self._endpoint_of(url), self.DEFAULT_CACHE_TTL)
+
+    def _cache_key(self, url: str) -> str:
+        # кеш на диске общий для всех аккаунтов, поэтому ключ включает логин
+        return f"{self.username}|{url}"
+
     def clear_cache(self) -> None:
-        """Очищает внутренний кеш для _get (вызывать перед новой загрузкой)."""
-        self._last_get_cache.clear()
+        """Очищает кеш в памяти для _get целиком (постоянный кеш не трогает)."""
+        self.memory_cache.clear()
+
+    def invalidate(self, endpoint: str) -> int:
+        """
+        Сбрасывает закешированные ответы одного эндпоинта в памяти и на диске.
+        :param endpoint: путь из EP_* (query отбрасывается), например MyStatSDK.EP_SCHEDULE
+        :return: сколько записей удалено из памяти
+        """
+        prefix = self.base_url + endpoint.split("?", 1)[0]
+        if self.disk_cache is not None:
+            self.disk_cache.invalidate_prefix(self._cache_key(prefix))
+        return self.memory_cache.invalidate_prefix(prefix)
+
+    @contextmanager
+    def strict(self):
+        """
+        Геттеры внутри блока не подменяют неудавшийся запрос значениями по умолчанию
+        ("0%", [0, 0], [] ...), а бросают UpstreamError — так сбой отличим от пустых данных.
+        Действует в текущем потоке и в потоках, которые SDK запускает для этого вызова.
+
+            with sdk.strict():
+                value = sdk.get_attendance()
+        """
+        with self._mode("strict"):
+            yield self
+
+    @contextmanager
+    def revalidate(self):
+        """
+        Геттеры внутри блока идут в сеть мимо кешей; удачный ответ заменяет записи
+        в памяти и на диске, а при сбое прежние записи остаются (в отличие от invalidate()).
+        Действует так же, как strict(): в текущем потоке и в потоках SDK для этого вызова.
+        """
+        with self._mode("revalidate"):
+            yield self
+
+    @contextmanager
+    def _mode(self, name: str):
+        depth = getattr(self._modes, name, 0)
+        setattr(self._modes, name, depth + 1)
+        try:
+            yield
+        finally:
+            setattr(self._modes, name, depth)
+
+    def _in_mode(self, name: str) -> bool:
+        return getattr(self._modes, name, 0) > 0
+
+    def _with_modes(self, fn: Callable) -> Callable:
+        """fn для другого потока: с теми же strict()/revalidate(), что сейчас у вызывающего."""
+        modes = [name for name in ("strict", "revalidate") if self._in_mode(name)]
+        if not modes:
+            return fn
+
+        def call(*args, **kwargs):
+            with ExitStack() as stack:
+                for name in modes:
+                    stack.enter_context(self._mode(name))
+                return fn(*args, **kwargs)
+        return call
 
     def _get(self, url: str, use_cache: bool = True) -> Optional[Any]:
         """
         Универсальный GET с таймаутом, кешем и авто-логином.
+        Одновременные вызовы с одним URL делят один сетевой запрос (счётчики — coalesce_stats).
         :param url: полный URL
-        :param use_cache: если True, ответ кешируется в рамках экземпляра
-        :return: распарсенный JSON или None
+        :param use_cache: если True, ответ кешируется в memory_cache (и в disk_cache, если задан)
+        :return: распарсенный JSON или None (в режиме strict() вместо None — UpstreamError)
         """
-        if use_cache and url in self._last_get_cache:
-            return self._last_get_cache[url]
+        endpoint = self._endpoint_of(url)
+        # в revalidate() кеши только пишем: читать их — значит отдать то, что просили обновить
+        read_cache = use_cache and not self._in_mode("revalidate")
+        if read_cache:
+            data = self.memory_cache.get(url)
+            if data is not None:
+                self.metrics.record_cache(endpoint, "memory")
+                return data
 
-        if not self._is_token_valid():
-            if not self.login():
-                return None
+        if read_cache and self.disk_cache is not None:
+            hit = self.disk_cache.get_with_age(self._cache_key(url))
+            if hit is not None:
+                data, _, ttl_left = hit
+                self.metrics.record_cache(endpoint, "disk")
+                # в памяти — только на остаток срока дисковой записи, иначе возраст данных удвоится
+                self.memory_cache.set(url, data, ttl_left)
+                return data
+
+        if use_cache:
+            self.metrics.record_cache(endpoint, "miss")
+
+        # такой же запрос уже в полёте — ждём его результат вместо второго похода в сеть
+        with self._inflight_lock:
+            flight = self._inflight.get(url)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[url] = _Flight()
+                self.coalesce_stats["requests"] += 1
+            else:
+                self.coalesce_stats["coalesced"] += 1
+        if not leader:
+            self.metrics.record_coalesced(endpoint)
+            flight.done.wait()
+            return self._checked(url, flight.result)
 
         try:
-            r = requests.get(url, headers=self._headers(), proxies=self.proxies, timeout=self.REQUEST_TIMEOUT)
+            flight.result = self._fetch_json(url, use_cache)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[url]
+            flight.done.set()
+        return self._checked(url, flight.result)
+
+    def _checked(self, url: str, data: Optional[Any]) -> Optional[Any]:
+        """None от _fetch_json — запрос не удался (причина уже в логе); в strict() это исключение."""
+        if data is None and self._in_mode("strict"):
+            raise UpstreamError(f"не удалось получить {url}")
+        return data
+
+    def _fetch_json(self, url: str, use_cache: bool) -> Optional[Any]:
+        """Сетевая часть _get: авто-логин, запрос, повтор после 401, запись в кеши."""
+        if not self.ensure_token():
+            return None
+
+        try:
+            token = self.session_token
+            r = self._send_get(url)
+            if r.status_code == 401:
+                # токен отозван раньше срока — один общий перелогин и одна повторная попытка
+                logger.info("401 на %s — обновляю токен", url)
+                if not self._refresh_token(token):
+                    return None
+                r = self._send_get(url)
             if r.status_code == 200:
                 data = r.json()
                 if use_cache:
-                    self._last_get_cache[url] = data
+                    ttl = self._cache_ttl(url)
+                    # в памяти кешируем и то, что на диск не пишем (file-token)
+                    self.memory_cache.set(url, data, ttl or self.DEFAULT_CACHE_TTL, size=len(r.content))
+                    if self.disk_cache is not None:
+                        self.disk_cache.set(self._cache_key(url), data, ttl)
                 return data
             logger.error("Ошибка запроса %s: %s — %s", url, r.status_code, r.text)
             return None
@@ -99,12 +426,203 @@ class MyStatSDK:
             logger.exception("Ошибка запроса %s: %s", url, e)
             return None
 
+    def _send_get(self, url: str) -> requests.Response:
+        """
+        GET через rate_limiter с повторами по retry_policy: 429/5xx и сетевые ошибки
+        повторяются с экспоненциальной паузой и джиттером (не меньше Retry-After),
+        пока не кончатся попытки или бюджет времени. Таймаут попытки не больше остатка
+        бюджета. Возвращает последний ответ либо пробрасывает последнюю сетевую ошибку.
+        """
+        endpoint = self._endpoint_of(url)
+        policy = self.retry_policy
+        deadline = time.monotonic() + policy.budget
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(endpoint)
+            retry_after = None
+            t0 = time.perf_counter()
+            try:
+                # попытка не выходит за общий бюджет времени запроса
+                timeout = max(0.001, min(self.REQUEST_TIMEOUT, deadline - time.monotonic()))
+                r = self.http.get(url, headers=self._headers(), proxies=self.proxies, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                r, error = None, e
+                self.metrics.record_request(endpoint, time.perf_counter() - t0, None)
+            else:
+                self.metrics.record_request(endpoint, time.perf_counter() - t0, r.status_code, len(r.content))
+                if r.status_code not in policy.RETRY_STATUSES:
+                    self.rate_limiter.on_success(endpoint)
+                    return r
+                retry_after = parse_retry_after(r.headers.get("Retry-After"))
+                if r.status_code == 429:
+                    self.rate_limiter.on_throttled(endpoint, retry_after)
+
+            delay = policy.delay(attempt, retry_after)
+            attempt += 1
+            if attempt >= policy.max_attempts or time.monotonic() + delay + policy.MIN_ATTEMPT_TIME > deadline:
+                if r is None:
+                    raise error
+                return r
+            logger.warning(
+                "Повтор %d/%d %s через %.2f c (%s)", attempt, policy.max_attempts - 1, url, delay,
+                r.status_code if r is not None else error.__class__.__name__,
+            )
+            self.metrics.record_retry(endpoint)
+            time.sleep(delay)
+
     # ---------------- API methods ----------------
 
     def get_grades(self) -> List[int]:
         """Возвращает список оценок (ints)."""
-        url = "https://mapi.itstep.org/v1/mystat/aqtobe/statistic/marks"
-        data = self._get(url)
+        return self._parse_grades(self._get(self.base_url + self.EP_GRADES))
+
+    def get_average_score(self) -> float:
+        """Берёт total_average_point из API (годовой)."""
+        return self._parse_average_score(self._get(self.base_url + self.EP_PROGRESS))
+
+    def get_leaderboard(self) -> List[str]:
+        """
+        Возвращает список имён лидеров (fio_stud).
+        Поддерживает несколько возможных форматов ответа.
+        """
+        return self._parse_leaderboard(self._get(self.base_url + self.EP_LEADERS))
+
+    def get_homework(self) -> List[int]:
+        """
+        Возвращает пару [done_count, overdue_count].
+        Обрабатывает разные структуры ответа.
+        """
+        return self._parse_homework_counts(self._get(self.base_url + self.EP_HW_COUNT))
+
+    def get_homeworks(self) -> "HomeworkList":
+        """Список ДЗ (homework/list) с индексами по id и по дате создания."""
+        return self._homework_view(self._get(self.base_url + self.EP_HW_LIST))
+
+    def _homework_view(self, data: Any) -> "HomeworkList":
+        # пока _get отдаёт тот же объект из кеша, HomeworkList не пересобираем
+        cached = self._hw_view
+        if data is not None and cached is not None and cached[0] is data:
+            return cached[1]
+        view = HomeworkList.from_response(data)
+        if data is not None:
+            self._hw_view = (data, view)
+        return view
+
+    def iter_homeworks(self, status: int = 3, page_size: int = 100, prefetch: bool = True) -> Iterator["Homework"]:
+        """
+        Ленивый обход всей истории ДЗ постранично (в отличие от EP_HW_LIST, где только первые 100).
+        Пока вызывающий код обрабатывает страницу, следующая уже качается в фоне.
+        В памяти одновременно не больше двух страниц, в кеш страницы не кладутся.
+        Страница только из уже полученных ДЗ завершает обход (сервер не листает по page).
+        :param status: статус ДЗ, как в API (3 — по умолчанию в приложении)
+        :param page_size: размер страницы (limit)
+        :param prefetch: качать следующую страницу заранее
+        """
+        def get_page(page: int) -> Any:
+            url = self.base_url + self.EP_HW_PAGE.format(status=status, limit=page_size, page=page)
+            return self._get(url, use_cache=False)
+
+        fetch = self._with_modes(get_page)
+
+        ex = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mystat-hw-pages") if prefetch else None
+        try:
+            page = 1
+            pending = ex.submit(fetch, page) if ex else None
+            seen = set()  # id уже отданных ДЗ
+            while True:
+                data = pending.result() if ex else fetch(page)
+                items = HomeworkList.parse_items(data)
+                if self._page_repeats(items, seen):
+                    logger.warning("История ДЗ: страница %d повторяет уже полученные — обход остановлен", page)
+                    return
+                has_next = self._has_next_page(data, page, page_size, len(items))
+                if has_next and ex:
+                    pending = ex.submit(fetch, page + 1)
+                yield from items
+                if not has_next:
+                    return
+                page += 1
+        finally:
+            if ex:
+                ex.shutdown(wait=False)
+
+    @staticmethod
+    def _page_repeats(items: List["Homework"], seen: set) -> bool:
+        """Страница только из уже отданных ДЗ (сервер игнорирует page); иначе её id добавляются в seen."""
+        ids = {hw.id for hw in items if hw.id is not None}
+        if ids and ids <= seen:
+            return True
+        seen |= ids
+        return False
+
+    @staticmethod
+    def _has_next_page(data: Any, page: int, page_size: int, count: int) -> bool:
+        """Есть ли страница после page: по _meta (pageCount), иначе — пока страницы полные."""
+        if not isinstance(data, dict) or count == 0:
+            return False
+        meta = data.get("_meta") or data.get("meta")
+        if isinstance(meta, dict) and meta.get("pageCount") is not None:
+            try:
+                return int(meta.get("currentPage", page)) < int(meta["pageCount"])
+            except (TypeError, ValueError):
+                pass
+        return count >= page_size
+
+    def get_homeworks_names(self) -> List[str]:
+        return self.get_homeworks().titles()
+
+    def get_id_hw(self):
+        return self.get_homeworks().ids()
+
+    def get_homeworks_list(self):
+        return self.get_homeworks().as_dicts()
+
+    def get_attendance(self) -> str:
+        """Возвращает строку вида '92.3%' (месячная посещаемость)."""
+        return self._parse_attendance(self._get(self.base_url + self.EP_ATTENDANCE))
+
+    def get_lessons(self, date_filter: str = "2025-09-15") -> List["Lesson"]:
+        """Уроки недели, в которую попадает date_filter (YYYY-MM-DD), по дате и времени начала."""
+        url = self.base_url + self.EP_SCHEDULE.format(date_filter=date_filter)
+        return LessonSchedule.parse_items(self._get(url))
+
+    def get_month_lessons(self, year: int, month: int) -> List["Lesson"]:
+        """
+        Уроки календарного месяца. API отдаёт расписание только по неделям, поэтому
+        запрашиваются все недели, задевающие месяц (параллельно в общем пуле на MONTH_WORKERS
+        потоков, каждая кешируется отдельно — соседние месяцы переиспользуют крайние недели),
+        а уроки чужих месяцев отбрасываются.
+        :param year: год
+        :param month: месяц 1..12
+        """
+        first = date_cls(year, month, 1)
+        last = first.replace(day=28) + timedelta(days=4)
+        last -= timedelta(days=last.day)
+        monday = first - timedelta(days=first.weekday())
+        weeks = []
+        while monday <= last:
+            weeks.append(monday.isoformat())
+            monday += timedelta(weeks=1)
+        with self._week_pool_lock:
+            if self._week_pool is None:
+                self._week_pool = ThreadPoolExecutor(max_workers=self.MONTH_WORKERS, thread_name_prefix="mystat-month")
+        parts = list(self._week_pool.map(self._with_modes(self.get_lessons), weeks))
+        return [lesson for part in parts for lesson in part if (lesson.date.year, lesson.date.month) == (year, month)]
+
+    def get_schedule(self, date_filter: str = "2025-09-15") -> List[str]:
+        """Расписание недели строками 'YYYY-MM-DD — предмет-YYYY-MM-DD' (старый формат; UI берёт get_lessons)."""
+        return [lesson.legacy_line() for lesson in self.get_lessons(date_filter)]
+
+    # ---------------- response parsers ----------------
+    # Чистые функции над JSON: их же использует AsyncMyStatSDK.
+
+    @staticmethod
+    def _parse_token(text: str) -> str:
+        # Токен приходит в теле как строка "...", поэтому strip('"')
+        return text.strip('"')
+
+    @staticmethod
+    def _parse_grades(data: Any) -> List[int]:
         if not data:
             return []
         if isinstance(data, list):
@@ -119,10 +637,8 @@ class MyStatSDK:
         logger.warning("get_grades: неожиданный формат ответа")
         return []
 
-    def get_average_score(self) -> float:
-        """Берёт total_average_point из API (годовой)."""
-        url = "https://mapi.itstep.org/v1/mystat/aqtobe/statistic/progress?period=year"
-        data = self._get(url)
+    @staticmethod
+    def _parse_average_score(data: Any) -> float:
         if isinstance(data, dict):
             try:
                 return round(float(data.get("total_average_point", 0) or 0), 2)
@@ -130,13 +646,8 @@ class MyStatSDK:
                 return 0.0
         return 0.0
 
-    def get_leaderboard(self) -> List[str]:
-        """
-        Возвращает список имён лидеров (fio_stud).
-        Поддерживает несколько возможных форматов ответа.
-        """
-        url = "https://mapi.itstep.org/v1/mystat/aqtobe/progress/leader-table"
-        data = self._get(url)
+    @staticmethod
+    def _parse_leaderboard(data: Any) -> List[str]:
         leaders: List[str] = []
         if isinstance(data, dict):
             group = data.get("group", {})
@@ -151,13 +662,8 @@ class MyStatSDK:
                     leaders.append(item.get("fio_stud", "Неизвестно"))
         return leaders
 
-    def get_homework(self) -> List[int]:
-        """
-        Возвращает пару [done_count, overdue_count].
-        Обрабатывает разные структуры ответа.
-        """
-        url = "https://mapi.itstep.org/v1/mystat/aqtobe/count/homework"
-        data = self._get(url)
+    @classmethod
+    def _parse_homework_counts(cls, data: Any) -> List[int]:
         if not data:
             return [0, 0]
 
@@ -188,28 +694,16 @@ class MyStatSDK:
             arr = data.get("data") or data.get("counts") or data
             if isinstance(arr, list):
                 # переиспользуем логику парсинга списка
-                return self._parse_homework_list(arr)
+                return cls._parse_homework_list(arr)
             if isinstance(arr, dict):
                 done = int(arr.get("done", 0) or 0)
                 overdue = int(arr.get("overdue", 0) or 0)
                 return [done, overdue]
 
         return [0, 0]
-    def get_homeworks_names(self) -> List[str]:
-        url = f"https://mapi.itstep.org/v1/mystat/aqtobe/homework/list?status=3&limit=100&sort=-hw.time"
-        data = self._get(url)
-        lessons_list = []
-        if isinstance(data, dict):
-            lessons = data.get("data", []) if data.get("data") else []
-            if isinstance(lessons, list):
-                for lesson in lessons:
-                    if isinstance(lesson, dict):
-                        subject = lesson.get("creation_time")
-                        lessons_list.append(subject)
-
-        return lessons_list
-    
-    def _parse_homework_list(self, arr: List[Any]) -> List[int]:
+
+    @staticmethod
+    def _parse_homework_list(arr: List[Any]) -> List[int]:
         done = overdue = 0
         for item in arr:
             if not isinstance(item, dict):
@@ -222,10 +716,8 @@ class MyStatSDK:
                 done += cnt
         return [done, overdue]
 
-    def get_attendance(self) -> str:
-        """Возвращает строку вида '92.3%' (месячная посещаемость)."""
-        url = "https://mapi.itstep.org/v1/mystat/aqtobe/statistic/attendance?period=month"
-        data = self._get(url)
+    @staticmethod
+    def _parse_attendance(data: Any) -> str:
         if isinstance(data, dict):
             # возможные ключи
             percent = data.get("percentOfAttendance") or data.get("percent") or data.get("percent_of_attendance")
@@ -240,99 +732,59 @@ class MyStatSDK:
                 return str(percent or "0%")
         return "0%"
 
+    @staticmethod
+    def _parse_schedule(data: Any) -> List[str]:
+        return [lesson.legacy_line() for lesson in LessonSchedule.parse_items(data)]
 
-    def get_schedule(self, date_filter: str = "2025-09-15") -> List[str]:
-        """Получить расписание недели, отсортированное по дате (по возрастанию)."""
-        url = f"https://mapi.itstep.org/v1/mystat/aqtobe/schedule/get-month?type=week&date_filter={date_filter}"
-        data = self._get(url)
-        lessons_list = []
+    @staticmethod
+    def _parse_homeworks_names(data: Any) -> List[str]:
+        return HomeworkList.from_response(data).titles()
 
-        # Вспомогательный парсер даты
-        def parse_date(d):
-            try:
-                return datetime.strptime(d, "%Y-%m-%d")
-            except Exception:
-                return None
+    @staticmethod
+    def _parse_homework_ids(data: Any) -> List[Any]:
+        return HomeworkList.from_response(data).ids()
 
-        # Сбор всех уроков
-        all_lessons = []
-        if isinstance(data, dict):
-            lessons = data.get("data", []) if data.get("data") else []
-            if isinstance(lessons, list):
-                all_lessons.extend(lessons)
-        elif isinstance(data, list):
-            all_lessons.extend(data)
+    @staticmethod
+    def _parse_homeworks_list(data: Any) -> List[Dict[str, Any]]:
+        return HomeworkList.from_response(data).as_dicts()
 
-        # Сортируем по дате
-        all_lessons.sort(key=lambda x: parse_date(x.get("date", "")) or datetime.max)
+    @staticmethod
+    def _parse_fs_link(js: Any) -> Optional[str]:
+        """Ссылка на загруженный файл из ответа FS (список с полем link) или None."""
+        if isinstance(js, list) and js and isinstance(js[0], dict) and js[0].get("link"):
+            return js[0]["link"]
+        return None
 
-        # Формируем строки
-        for lesson in all_lessons:
-            if isinstance(lesson, dict):
-                date = lesson.get("date", "Неизвестно")
-                subject = lesson.get("subject_name", "Без названия")+'-'+lesson.get("date", "")
-                lessons_list.append(f"{date} — {subject}")
+    # ---------------- files ----------------
 
-        return lessons_list
-    
     def download_homework_by_date(self, date_filter: str, folder: str = "homeworks"):
         """
         Скачивает ДЗ только за указанную дату.
         :param date_filter: Дата в формате YYYY-MM-DD
         :param folder: Папка для сохранения файлов
         """
-        import requests
-        import os
-        from datetime import datetime
-
         os.makedirs(folder, exist_ok=True)
 
-        url = "https://mapi.itstep.org/v1/mystat/aqtobe/homework/list?status=3&limit=100&sort=-hw.time"
-        data = self._get(url, use_cache=False)
+        data = self._get(self.base_url + self.EP_HW_LIST, use_cache=False)
         if not data or "data" not in data:
             print("Ошибка: не удалось получить список ДЗ")
             return
 
-        homeworks = data.get("data", [])
-        target_hw = None
-        for hw in homeworks:
-            hw_time = hw.get("creation_time")
-            if not hw_time:
-                continue
-
-            try:
-                dt = datetime.fromtimestamp(int(hw_time))
-            except:
-                try:
-                    dt = datetime.fromisoformat(str(hw_time).replace("Z", "+00:00"))
-                except:
-                    continue
-
-            if dt.strftime("%Y-%m-%d") == date_filter:
-                target_hw = hw
-                break
-
-        if not target_hw:
+        matches = self._homework_view(data).on_date(date_filter)
+        if not matches:
             print(f"Нет ДЗ за дату {date_filter}")
             return
+        target_hw = matches[0]
 
-        f_url = target_hw.get("file_path")
+        f_url = target_hw.file_path
         if not f_url:
             print(f"У ДЗ за {date_filter} нет прикреплённого файла")
             return
 
         try:
-            r = requests.get(f_url, headers=self._headers(), stream=True, timeout=10)
+            r = self.http.get(f_url, headers=self._headers(), proxies=self.proxies, stream=True, timeout=self.DOWNLOAD_TIMEOUT)
             if r.status_code == 200:
-                cd = r.headers.get("Content-Disposition", "")
-                ext = ""
-                if "filename=" in cd:
-                    fname = cd.split("filename=")[-1].strip().strip('"')
-                    if "." in fname:
-                        ext = "." + fname.split(".")[-1]
-
-                if not ext and "." in f_url:
-                    ext = "." + f_url.split(".")[-1]
+                ext = self._guess_ext(r.headers, f_url)
 
                 filename = f"{date_filter}{ext or '.bin'}"
                 filepath = os.path.join(folder, filename)
@@ -344,48 +796,188 @@ class MyStatSDK:
                     counter += 1
 
                 with open(filepath, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=8192):
+                    for chunk in r.iter_content(chunk_size=self.DOWNLOAD_CHUNK_SIZE):
                         if chunk:
                             f.write(chunk)
 
                 print(f"Сохранено: {filepath}")
             else:
                 print(f"Ошибка загрузки {f_url}: {r.status_code}")
+                r.close()  # возвращаем соединение в пул, тело не читаем
 
         except Exception as e:
             print(f"Не удалось скачать {f_url}: {e}")
 
-    def get_id_hw(self):
-        url = f"https://mapi.itstep.org/v1/mystat/aqtobe/homework/list?status=3&limit=100&sort=-hw.time"
-        data = self._get(url)
-        ids_list = []
-        if isinstance(data, dict):
-            lessons = data.get("data", []) if data.get("data") else []
-            if isinstance(lessons, list):
-                for lesson in lessons:
-                    if isinstance(lesson, dict):
-                        subject = lesson.get("id")
-                        ids_list.append(subject)
+    def download_homeworks(
+        self,
+        start_date: str,
+        end_date: str,
+        folder: str = "homeworks",
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        progress: Optional[Callable[[int, int, int, int], None]] = None,
+    ) -> List[str]:
+        """
+        Скачивает вложения всех ДЗ за период параллельно.
+        Файлы называются YYYY-MM-DD_<id>.<ext>; уже скачанные пропускаются,
+        недокачанные (*.part) докачиваются через HTTP Range.
+        :param start_date: первая дата периода, YYYY-MM-DD (включительно)
+        :param end_date: последняя дата периода, YYYY-MM-DD (включительно)
+        :param folder: папка для сохранения
+        :param workers: сколько файлов качать одновременно (по умолчанию DOWNLOAD_WORKERS)
+        :param chunk_size: размер куска записи (по умолчанию DOWNLOAD_CHUNK_SIZE)
+        :param progress: progress(байт_скачано, байт_всего, файлов_готово, файлов_всего);
+                         вызывается из рабочих потоков
+        :return: пути сохранённых (или уже существовавших) файлов
+        """
+        os.makedirs(folder, exist_ok=True)
+        jobs = []
+        homeworks = self.iter_homeworks()
+        try:
+            for hw in homeworks:
+                if hw.date and hw.date < start_date:
+                    break  # список идёт от новых к старым — дальше только более ранние ДЗ
+                if hw.file_path and hw.date and hw.date <= end_date:
+                    jobs.append(hw)
+        finally:
+            homeworks.close()
+        tracker = _DownloadProgress(len(jobs), progress)
+
+        def job(hw: "Homework") -> Optional[str]:
+            try:
+                return self._download_resumable(
+                    hw.file_path, os.path.join(folder, f"{hw.date}_{hw.id}"),
+                    chunk_size or self.DOWNLOAD_CHUNK_SIZE, tracker,
+                )
+            except Exception as e:
+                logger.error("Не удалось скачать ДЗ %s (%s): %s", hw.id, hw.file_path, e)
+                return None
+            finally:
+                tracker.file_done()
 
-        return ids_list
+        with ThreadPoolExecutor(max_workers=workers or self.DOWNLOAD_WORKERS, thread_name_prefix="mystat-dl") as ex:
+            saved = [path for path in ex.map(job, jobs) if path]
+        logger.info("Скачано %d из %d файлов ДЗ за %s — %s", len(saved), len(jobs), start_date, end_date)
+        return saved
 
-    def get_homeworks_list(self):
-        url = "https://mapi.itstep.org/v1/mystat/aqtobe/homework/list?status=3&limit=100&sort=-hw.time"
-        data = self._get(url)
-        result = []
-        if isinstance(data, dict):
-            lessons = data.get("data", []) if data.get("data") else []
-            if isinstance(lessons, list):
-                for lesson in lessons:
-                    if isinstance(lesson, dict):
-                        hw_id = lesson.get("id")
-                        title = lesson.get("creation_time")
-                        if hw_id is not None:
-                            result.append({"id": hw_id, "title": title})
-        return result
+    def _download_resumable(self, url: str, base_path: str, chunk_size: int, tracker: "_DownloadProgress") -> str:
+        """
+        Качает url в base_path + расширение. Пишет в base_path.part и докачивает его
+        с места обрыва (Range + If-Range с ETag/Last-Modified первой загрузки, который
+        хранится в base_path.part.meta). Если файл на сервере сменился, сервер ответил 200
+        или Content-Range начинается не с того байта — .part обнуляется и файл качается заново.
+        """
+        done = [
+            p for p in glob.glob(glob.escape(base_path) + ".*")
+            if not p.endswith((".part", ".part.meta"))
+        ]
+        if done:
+            return done[0]
+
+        part = base_path + ".part"
+        meta = part + ".meta"
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        validator = self._read_validator(meta) if offset else None
+        if not validator:
+            offset = 0  # без валидатора не проверить, что на сервере та же версия файла
+
+        while True:
+            headers = self._headers()
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                headers["If-Range"] = validator
+            t0 = time.perf_counter()
+            with self.http.get(url, headers=headers, proxies=self.proxies, stream=True, timeout=self.DOWNLOAD_TIMEOUT) as r:
+                # время до заголовков ответа; байты тела досчитываются по мере чтения
+                self.metrics.record_request(self.METRIC_FS_DOWNLOAD, time.perf_counter() - t0, r.status_code)
+                start, total = self._parse_content_range(r.headers.get("Content-Range"))
+                if offset and (
+                    (r.status_code == 416 and total != offset)
+                    or (r.status_code == 206 and start != offset)
+                ):
+                    logger.warning("Докачка %s: сервер ответил не с байта %d — качаю заново", url, offset)
+                    offset = 0
+                    continue
+                if r.status_code == 416 and offset:
+                    pass  # .part уже полный — сервер не может отдать байты после конца
+                elif r.status_code in (200, 206):
+                    if r.status_code == 200:
+                        offset = 0  # Range не поддержан или файл сменился (If-Range) — качаем целиком
+                        self._write_validator(meta, r.headers.get("ETag") or r.headers.get("Last-Modified"))
+                    length = int(r.headers.get("Content-Length", 0) or 0)
+                    tracker.add(total=offset + length, done=offset)
+                    with open(part, "ab" if offset else "wb") as f:
+                        for chunk in r.iter_content(chunk_size=chunk_size):
+                            if chunk:
+                                f.write(chunk)
+                                tracker.add(done=len(chunk))
+                                self.metrics.record_bytes(self.METRIC_FS_DOWNLOAD, bytes_in=len(chunk))
+                else:
+                    raise RuntimeError(f"HTTP {r.status_code}")
+                ext = self._guess_ext(r.headers, url)
+            break
+
+        final = base_path + (ext or ".bin")
+        os.replace(part, final)
+        if os.path.exists(meta):
+            os.remove(meta)
+        return final
+
+    @staticmethod
+    def _parse_content_range(value: Optional[str]):
+        """'bytes 100-199/200' -> (100, 200); 'bytes */200' -> (None, 200); нет/мусор -> (None, None)."""
+        if not value or not value.startswith("bytes "):
+            return None, None
+        span, _, total = value[6:].partition("/")
+        try:
+            size = int(total) if total and total != "*" else None
+            return (int(span.split("-", 1)[0]) if span != "*" else None), size
+        except ValueError:
+            return None, None
 
-    def upload_to_fs(self, file_path: str, directory: str = None) -> str:
-        """Загружает файл на файловый сервер ITStep и возвращает URL"""
+    @staticmethod
+    def _read_validator(path: str) -> Optional[str]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    @staticmethod
+    def _write_validator(path: str, validator: Optional[str]) -> None:
+        """Запоминает ETag/Last-Modified версии, которая пишется в .part; нет валидатора — докачки не будет."""
+        if validator:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(validator)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    @staticmethod
+    def _guess_ext(headers: Any, url: str) -> str:
+        """Расширение файла из Content-Disposition, иначе из пути URL; '' если не понять."""
+        cd = headers.get("Content-Disposition", "")
+        if "filename=" in cd:
+            fname = cd.split("filename=")[-1].strip().strip('"')
+            if "." in fname:
+                return "." + fname.split(".")[-1]
+        name = urlsplit(url).path.rsplit("/", 1)[-1]
+        if "." in name:
+            return "." + name.split(".")[-1]
+        return ""
+
+    def upload_to_fs(
+        self,
+        file_path: str,
+        directory: str = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> str:
+        """
+        Загружает файл на файловый сервер ITStep и возвращает URL.
+        Тело multipart отдаётся потоком кусками UPLOAD_CHUNK_SIZE — файл целиком в память не читается.
+        :param progress: progress(отправлено_байт, всего_байт) после каждого куска
+        :param cancel: если событие выставлено, загрузка прерывается с UploadCancelled
+        """
 
         if not file_path or not os.path.exists(file_path):
             raise FileNotFoundError(f"Файл '{file_path}' не найден")
@@ -395,75 +987,656 @@ class MyStatSDK:
         if directory is None:
             directory = fs_info["directories"]["homeworkDirId"]
 
-        hosts = [
-            "https://fsx3.itstep.org",
-            "https://fsx2.itstep.org",
-            "https://fsx1.itstep.org",
-            "https://fs3.itstep.org",
-            "https://fs2.itstep.org",
-            "https://fs1.itstep.org",
-        ]
+        # зеркала по скорости; давно не проверяли — сначала замеряем все параллельно
+        if self.fs_health.needs_probe():
+            self.fs_health.probe(self.http, self.proxies, self.FS_CONNECT_TIMEOUT)
+        hosts = self.fs_health.ranked()
 
         headers = {
             "Authorization": f"Bearer {token}"
         }
 
         errors = []
-        for base in hosts:
-            url = f"{base}/api/v1/files"
-            try:
-                with open(file_path, "rb") as f:
-                    files = {
-                        "files[]": (os.path.basename(file_path), f)
-                    }
-                    data = {
-                        "directory": directory
-                    }
-                    r = requests.post(url, headers=headers, data=data, files=files, timeout=40)
-                    if r.status_code == 200:
-                        js = r.json()
-                        if isinstance(js, list) and js and js[0].get("link"):
-                            return js[0]["link"]
-                    errors.append(f"{url} — HTTP {r.status_code}: {r.text[:200]}")
-            except Exception as e:
-                errors.append(f"{url} — {e}")
+        try:
+            for base in hosts:
+                link = self._upload_to_host(base, headers, file_path, directory, errors, progress, cancel)
+                if link:
+                    return link
+        finally:
+            self._save_fs_health()
 
         raise RuntimeError("FS upload failed. Tried:\n" + "\n".join(errors))
 
-
-    def upload_homework(self, homework_id: int, file_path: str, comment: str = ""):
-        """Загружает ДЗ с файлом: сначала на FS, потом отправляет ссылку в MyStat"""
+    def _upload_to_host(
+        self,
+        base: str,
+        headers: Dict[str, str],
+        file_path: str,
+        directory: Any,
+        errors: List[str],
+        progress: Optional[Callable[[int, int], None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> Optional[str]:
+        """Одна попытка загрузки на зеркало base; исход записывается в fs_health."""
+        url = f"{base}/api/v1/files"
+        body = MultipartStream(
+            {"directory": directory}, "files[]", file_path,
+            self.UPLOAD_CHUNK_SIZE, progress, cancel,
+        )
+        t0 = time.perf_counter()
+        r = None
+        try:
+            r = self.http.post(
+                url, headers={**headers, "Content-Type": body.content_type}, data=body,
+                proxies=self.proxies, timeout=(self.FS_CONNECT_TIMEOUT, self.FS_UPLOAD_TIMEOUT),
+            )
+            self.metrics.record_request(
+                self.METRIC_FS_UPLOAD, time.perf_counter() - t0, r.status_code, len(r.content), len(body),
+            )
+            if r.status_code == 200:
+                link = self._parse_fs_link(r.json())
+                if link:
+                    self.fs_health.record_success(base)
+                    return link
+            if r.status_code >= 500:
+                self.fs_health.record_failure(base)
+            errors.append(f"{url} — HTTP {r.status_code}: {r.text[:200]}")
+        except Exception as e:
+            if r is None:
+                self.metrics.record_request(self.METRIC_FS_UPLOAD, time.perf_counter() - t0, None)
+            # отмена не вина зеркала и не повод пробовать следующее
+            if cancel is not None and cancel.is_set():
+                raise UploadCancelled(file_path) from e
+            self.fs_health.record_failure(base)
+            errors.append(f"{url} — {e}")
+        return None
+
+    def _save_fs_health(self) -> None:
+        if self.disk_cache is not None:
+            self.disk_cache.set(HostHealth.CACHE_KEY, self.fs_health.dump(), self.FS_HEALTH_TTL)
+
+
+    def upload_homework(
+        self,
+        homework_id: int,
+        file_path: str,
+        comment: str = "",
+        progress: Optional[Callable[[int, int], None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> bool:
+        """
+        Загружает ДЗ с файлом: сначала на FS, потом отправляет ссылку в MyStat.
+        progress и cancel передаются в upload_to_fs. Возвращает True, если ДЗ принято.
+        """
         if not file_path or not os.path.exists(file_path):
             print("Файл не выбран или не существует")
-            return
+            return False
 
         try:
 
-            file_url = self.upload_to_fs(file_path)
+            file_url = self.upload_to_fs(file_path, progress=progress, cancel=cancel)
 
-            url = f"https://mapi.itstep.org/v1/mystat/aqtobe/homework/create"
+            url = self.base_url + self.EP_HW_CREATE
             payload = {
                 "answerText": comment,
                 "filename": file_url,
                 "id": homework_id
             }
 
-            r = requests.post(url, headers=self._headers(), json=payload, timeout=60)
+            self.rate_limiter.acquire(self.EP_HW_CREATE)
+            t0 = time.perf_counter()
+            r = self.http.post(url, headers=self._headers(), json=payload, proxies=self.proxies, timeout=60)
+            self.metrics.record_request(
+                self.EP_HW_CREATE, time.perf_counter() - t0, r.status_code, len(r.content), len(r.request.body or b""),
+            )
             if r.status_code in (200, 201):
                 print(f"ДЗ {homework_id} успешно отправлено: {file_url}")
-            else:
-                print(f"Ошибка при создании ДЗ: {r.status_code} — {r.text}")
+                return True
+            print(f"Ошибка при создании ДЗ: {r.status_code} — {r.text}")
+            return False
 
+        except UploadCancelled:
+            print("Загрузка ДЗ отменена")
+            return False
         except Exception as e:
             print(f"Ошибка при загрузке ДЗ: {e}")
+            return False
 
 
     def upls_fs(self):
-        url='https://mapi.itstep.org/v1/mystat/aqtobe/user/file-token'
+        url = self.base_url + self.EP_FILE_TOKEN
         data = self._get(url)
         return data #['directories']['homeworkDirId']
 
+def parse_hw_time(value: Any) -> Optional[datetime]:
+    """creation_time из API: unix-время (число или строка) либо ISO-строка. None, если не разобрать."""
+    if value is None or value == "":
+        return None
+    try:
+        return datetime.fromtimestamp(int(value))
+    except (TypeError, ValueError, OverflowError, OSError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+class Homework:
+    """Одно ДЗ из homework/list. Даты создания и сдачи разбираются один раз при построении."""
+
+    __slots__ = ("id", "creation_time", "created", "date", "file_path", "subject", "theme", "deadline")
+
+    def __init__(self, id: Any, creation_time: Any = None, file_path: Optional[str] = None,
+                 subject: Optional[str] = None, theme: Optional[str] = None, completion_time: Any = None):
+        self.id = id
+        self.creation_time = creation_time  # как пришло из API (используется как заголовок карточки)
+        self.created = parse_hw_time(creation_time)
+        self.date = self.created.strftime("%Y-%m-%d") if self.created else None
+        self.file_path = file_path
+        self.subject = subject
+        self.theme = theme
+        completed = parse_hw_time(completion_time)
+        self.deadline = completed.date() if completed else None  # срок сдачи (completion_time)
+
+    @classmethod
+    def from_json(cls, item: Dict[str, Any]) -> "Homework":
+        return cls(
+            item.get("id"),
+            item.get("creation_time"),
+            item.get("file_path"),
+            item.get("name_spec"),
+            item.get("theme"),
+            item.get("completion_time"),
+        )
+
+    def __repr__(self) -> str:
+        return f"Homework(id={self.id!r}, date={self.date!r})"
+
+
+class HomeworkList:
+    """
+    Неизменяемая коллекция ДЗ одного ответа API с индексами по id и по дате (YYYY-MM-DD).
+    Порядок — как в ответе сервера (sort=-hw.time, новые сначала).
+    """
+
+    __slots__ = ("items", "_by_id", "_by_date")
+
+    def __init__(self, items: List[Homework]):
+        self.items = items
+        self._by_id: Dict[Any, Homework] = {}
+        self._by_date: Dict[str, List[Homework]] = {}
+        for hw in items:
+            if hw.id is not None:
+                self._by_id.setdefault(hw.id, hw)
+            if hw.date:
+                self._by_date.setdefault(hw.date, []).append(hw)
+
+    @classmethod
+    def from_response(cls, data: Any) -> "HomeworkList":
+        """Строит коллекцию из ответа homework/list ({"data": [...]}); мусор пропускается."""
+        return cls(cls.parse_items(data))
+
+    @staticmethod
+    def parse_items(data: Any) -> List[Homework]:
+        """Записи Homework из одного ответа homework/list без построения индексов."""
+        if isinstance(data, dict):
+            lessons = data.get("data", []) if data.get("data") else []
+            if isinstance(lessons, list):
+                return [Homework.from_json(x) for x in lessons if isinstance(x, dict)]
+        return []
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def get(self, hw_id: Any) -> Optional[Homework]:
+        """ДЗ по id или None."""
+        return self._by_id.get(hw_id)
+
+    def on_date(self, date: str) -> List[Homework]:
+        """
+        Все ДЗ, созданные в указанный день.
+        :param date: 'YYYY-MM-DD' либо значение в формате creation_time
+        """
+        found = self._by_date.get(date)
+        if found is None:
+            dt = parse_hw_time(date)
+            found = self._by_date.get(dt.strftime("%Y-%m-%d")) if dt else None
+        return list(found or [])
+
+    def titles(self) -> List[Any]:
+        return [hw.creation_time for hw in self.items]
+
+    def ids(self) -> List[Any]:
+        return [hw.id for hw in self.items]
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        """Формат, который ждёт UI: [{'id': ..., 'title': ..., 'deadline': 'YYYY-MM-DD' | None}] (без ДЗ без id)."""
+        return [
+            {"id": hw.id, "title": hw.creation_time, "deadline": hw.deadline.isoformat() if hw.deadline else None}
+            for hw in self.items if hw.id is not None
+        ]
+
+
+def _parse_iso_date(value: Any) -> Optional[date_cls]:
+    """'YYYY-MM-DD' (или начало ISO-строки) -> date; None, если не разобрать."""
+    if isinstance(value, date_cls):
+        return value
+    try:
+        return date_cls.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _parse_hhmm(value: Any) -> Optional[time_cls]:
+    """'HH:MM' или 'HH:MM:SS' -> time; None, если не разобрать."""
+    if not value:
+        return None
+    try:
+        return time_cls.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+class Lesson:
+    """Один урок из schedule/get-month. Дата и время разбираются один раз при построении."""
+
+    __slots__ = ("date", "number", "start", "end", "subject", "teacher", "room")
+
+    def __init__(self, date: date_cls, number: Optional[int] = None, start: Optional[time_cls] = None,
+                 end: Optional[time_cls] = None, subject: Optional[str] = None,
+                 teacher: Optional[str] = None, room: Optional[str] = None):
+        self.date = date
+        self.number = number  # номер пары в дне
+        self.start = start
+        self.end = end
+        self.subject = subject
+        self.teacher = teacher
+        self.room = room
+
+    @classmethod
+    def from_json(cls, item: Dict[str, Any]) -> Optional["Lesson"]:
+        """Урок из записи API (или из to_json()); None, если нет разбираемой даты."""
+        day = _parse_iso_date(item.get("date"))
+        if day is None:
+            return None
+        number = item.get("lesson")
+        try:
+            number = int(number) if number is not None else None
+        except (TypeError, ValueError):
+            number = None
+        return cls(
+            day,
+            number,
+            _parse_hhmm(item.get("started_at")),
+            _parse_hhmm(item.get("finished_at")),
+            item.get("subject_name"),
+            item.get("teacher_name"),
+            item.get("room_name"),
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        """Обратно в формат API — для снимков и кеша; from_json(to_json()) == self."""
+        return {
+            "date": self.date.isoformat(),
+            "lesson": self.number,
+            "started_at": self.start.strftime("%H:%M") if self.start else None,
+            "finished_at": self.end.strftime("%H:%M") if self.end else None,
+            "subject_name": self.subject,
+            "teacher_name": self.teacher,
+            "room_name": self.room,
+        }
+
+    def sort_key(self):
+        return (self.date, self.start or time_cls.max, self.number if self.number is not None else 1 << 30)
+
+    def _fields(self):
+        return (self.date, self.number, self.start, self.end, self.subject, self.teacher, self.room)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Lesson) and self._fields() == other._fields()
+
+    def __hash__(self) -> int:
+        return hash(self._fields())
+
+    def legacy_line(self) -> str:
+        """Строка старого get_schedule: 'YYYY-MM-DD — предмет-YYYY-MM-DD'."""
+        day = self.date.isoformat()
+        return f"{day} — {self.subject or 'Без названия'}-{day}"
+
+    def __repr__(self) -> str:
+        return f"Lesson({self.date.isoformat()} {self.start}, {self.subject!r})"
+
+
+class LessonSchedule:
+    """
+    Неизменяемое расписание: уроки по дате и времени начала с индексом по дню (datetime.date).
+    Собирается один раз из ответов API, UI читает его напрямую.
+    """
+
+    __slots__ = ("items", "_by_date")
+
+    def __init__(self, lessons: Iterable[Lesson]):
+        self.items = sorted(lessons, key=Lesson.sort_key)
+        self._by_date: Dict[date_cls, List[Lesson]] = {}
+        for lesson in self.items:
+            self._by_date.setdefault(lesson.date, []).append(lesson)
+
+    @classmethod
+    def from_response(cls, data: Any) -> "LessonSchedule":
+        """Из ответа schedule/get-month ({"data": [...]}) или списка записей / Lesson."""
+        return cls(cls.parse_items(data))
+
+    @staticmethod
+    def parse_items(data: Any) -> List[Lesson]:
+        """Уроки одного ответа, отсортированные; мусор и записи без даты пропускаются."""
+        if isinstance(data, dict):
+            data = data.get("data") or []
+        if not isinstance(data, list):
+            return []
+        lessons = []
+        for item in data:
+            if isinstance(item, Lesson):
+                lessons.append(item)
+            elif isinstance(item, dict):
+                lesson = Lesson.from_json(item)
+                if lesson is not None:
+                    lessons.append(lesson)
+        lessons.sort(key=Lesson.sort_key)
+        return lessons
+
+    @classmethod
+    def merge(cls, parts: Iterable[Iterable[Lesson]]) -> "LessonSchedule":
+        """Одно расписание из нескольких списков уроков (например, по неделям)."""
+        return cls(lesson for part in parts if part for lesson in part)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __contains__(self, day: date_cls) -> bool:
+        return day in self._by_date
+
+    def on_date(self, day: date_cls) -> List[Lesson]:
+        """Уроки дня по порядку (пустой список, если уроков нет)."""
+        return list(self._by_date.get(day, ()))
+
+    def dates(self) -> List[date_cls]:
+        """Дни, в которые есть уроки, по возрастанию."""
+        return list(self._by_date)
+
+    def to_json(self) -> List[Dict[str, Any]]:
+        return [lesson.to_json() for lesson in self.items]
+
+
+class _Flight:
+    """Запрос в полёте: ведущий поток кладёт result и выставляет done, остальные ждут."""
+
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+
+
+class UpstreamError(Exception):
+    """Запрос к API не удался (сеть, 5xx, вход), а значения по умолчанию запрещены — см. MyStatSDK.strict()."""
+
+
+class UploadCancelled(Exception):
+    """Загрузка прервана по запросу (выставлено событие cancel)."""
+
+
+class MultipartStream:
+    """
+    Потоковое тело multipart/form-data: поля + один файл, читаемый кусками.
+    Длина известна заранее (__len__), поэтому requests шлёт Content-Length, а не chunked.
+    Каждую попытку загрузки нужен новый объект — файл открывается при итерации.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, Any],
+        file_field: str,
+        file_path: str,
+        chunk_size: int = 64 * 1024,
+        progress: Optional[Callable[[int, int], None]] = None,
+        cancel: Optional[threading.Event] = None,
+    ):
+        self.boundary = uuid.uuid4().hex
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.cancel = cancel
+
+        head = b""
+        for name, value in fields.items():
+            head += (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f"{value}\r\n"
+            ).encode("utf-8")
+        filename = os.path.basename(file_path).replace('"', "%22")
+        head += (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+        self._head = head
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode("utf-8")
+        self._length = len(head) + os.path.getsize(file_path) + len(self._tail)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        sent = 0
+
+        def emit(chunk: bytes) -> bytes:
+            nonlocal sent
+            if self.cancel is not None and self.cancel.is_set():
+                raise UploadCancelled(self.file_path)
+            sent += len(chunk)
+            if self.progress:
+                self.progress(sent, self._length)
+            return chunk
+
+        yield emit(self._head)
+        with open(self.file_path, "rb") as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield emit(chunk)
+        yield emit(self._tail)
+
+
+class HostHealth:
+    """
+    Статистика зеркал файлового сервера: задержка (EWMA по пробам) и подряд идущие отказы.
+    Отказавшее зеркало уходит на «остывание» (circuit breaker) с растущей паузой,
+    ranked() отдаёт здоровые зеркала от быстрых к медленным, остывающие — в конце.
+    """
+
+    CACHE_KEY = "fs:host-health"  # ключ в DiskCache (общий для всех аккаунтов)
+    PROBE_INTERVAL = 3600  # seconds — как часто перемеривать зеркала
+    COOLDOWN_BASE = 30  # seconds — пауза после первого отказа, дальше удваивается
+    COOLDOWN_MAX = 1800
+    EWMA_ALPHA = 0.3
+
+    def __init__(self, hosts: List[str]):
+        self.hosts = list(hosts)
+        self.latency: Dict[str, float] = {}
+        self.failures: Dict[str, int] = {}
+        self.cooldown_until: Dict[str, float] = {}
+        self.probed_at: float = 0.0
+        self._lock = threading.Lock()
+
+    def needs_probe(self) -> bool:
+        return time.time() - self.probed_at > self.PROBE_INTERVAL
+
+    def probe(self, http: requests.Session, proxies: Dict[str, str] = None, timeout: float = 3) -> None:
+        """Параллельно меряет время ответа каждого зеркала (любой HTTP-ответ = живое)."""
+        def one(host: str) -> None:
+            t0 = time.perf_counter()
+            try:
+                http.head(host, proxies=proxies, timeout=timeout).close()
+            except requests.RequestException:
+                self.record_failure(host)
+                return
+            self.record_latency(host, time.perf_counter() - t0)
+            self.record_success(host)
+
+        with ThreadPoolExecutor(max_workers=len(self.hosts) or 1, thread_name_prefix="mystat-fs-probe") as ex:
+            list(ex.map(one, self.hosts))
+        self.probed_at = time.time()
+
+    def ranked(self) -> List[str]:
+        """Зеркала в порядке попыток: доступные по задержке (неизмеренные — после измеренных), затем остывающие."""
+        now = time.time()
+        with self._lock:
+            def key(host: str):
+                cooling = self.cooldown_until.get(host, 0) > now
+                return (cooling, self.latency.get(host, float("inf")), self.hosts.index(host))
+            return sorted(self.hosts, key=key)
+
+    def record_latency(self, host: str, seconds: float) -> None:
+        with self._lock:
+            prev = self.latency.get(host)
+            self.latency[host] = seconds if prev is None else prev + self.EWMA_ALPHA * (seconds - prev)
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self.failures.pop(host, None)
+            self.cooldown_until.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            n = self.failures.get(host, 0) + 1
+            self.failures[host] = n
+            self.cooldown_until[host] = time.time() + min(self.COOLDOWN_BASE * 2 ** (n - 1), self.COOLDOWN_MAX)
+
+    def dump(self) -> Dict[str, Any]:
+        """Состояние для сохранения между сессиями (JSON-совместимое)."""
+        with self._lock:
+            return {
+                "latency": dict(self.latency),
+                "failures": dict(self.failures),
+                "cooldown_until": dict(self.cooldown_until),
+                "probed_at": self.probed_at,
+            }
+
+    def load(self, state: Optional[Dict[str, Any]]) -> None:
+        """Восстанавливает dump(); зеркала, которых нет в self.hosts, игнорируются."""
+        if not isinstance(state, dict):
+            return
+        with self._lock:
+            for name in ("latency", "failures", "cooldown_until"):
+                saved = state.get(name) or {}
+                getattr(self, name).update({h: v for h, v in saved.items() if h in self.hosts})
+            self.probed_at = float(state.get("probed_at") or 0.0)
+
+
+class _DownloadProgress:
+    """Общий счётчик байт/файлов для download_homeworks (обновляется из нескольких потоков)."""
+
+    def __init__(self, files_total: int, callback: Optional[Callable[[int, int, int, int], None]]):
+        self.files_total = files_total
+        self.files_done = 0
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self._callback = callback
+        self._lock = threading.Lock()
+
+    def add(self, total: int = 0, done: int = 0) -> None:
+        with self._lock:
+            self.bytes_total += total
+            self.bytes_done += done
+            snapshot = (self.bytes_done, self.bytes_total, self.files_done, self.files_total)
+        if self._callback:
+            self._callback(*snapshot)
+
+    def file_done(self) -> None:
+        with self._lock:
+            self.files_done += 1
+        self.add()
+
+
+class FetchPlanner:
+    """
+    Параллельная выборка независимых эндпоинтов с ограничением конкурентности.
+    Принимает словарь {имя: функция без аргументов}, возвращает {имя: результат}
+    и запоминает время каждого вызова в self.timings.
+    """
+
+    MAX_WORKERS = 6  # не больше MyStatSDK.POOL_MAXSIZE, иначе пул начнёт открывать лишние соединения
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.timings: Dict[str, float] = {}
+        self.total_time: float = 0.0
+
+    def run(
+        self,
+        tasks: Dict[str, Callable[[], Any]],
+        on_result: Optional[Callable[[str, Any], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Выполняет задачи параллельно (не более max_workers одновременно).
+        Исключение любой задачи пробрасывается после завершения остальных.
+        :param on_result: вызывается как on_result(имя, результат) сразу по готовности задачи
+                          (из рабочего потока пула)
+        """
+        timings: Dict[str, float] = {}
+
+        def timed(name: str, fn: Callable[[], Any]) -> Any:
+            t0 = time.perf_counter()
+            try:
+                result = fn()
+            finally:
+                timings[name] = time.perf_counter() - t0
+            if on_result is not None:
+                on_result(name, result)
+            return result
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mystat-fetch") as ex:
+            futures = {name: ex.submit(timed, name, fn) for name, fn in tasks.items()}
+        self.total_time = time.perf_counter() - t0
+        self.timings = timings
+
+        slowest = self.critical_path()
+        if slowest:
+            logger.info(
+                "Выборка: %d вызовов за %.2f c, самый долгий — %s (%.2f c)",
+                len(tasks), self.total_time, slowest, timings[slowest],
+            )
+        return {name: f.result() for name, f in futures.items()}
+
+    def critical_path(self) -> Optional[str]:
+        """Имя самого долгого вызова последнего прогона (он и задаёт время обновления)."""
+        if not self.timings:
+            return None
+        return max(self.timings, key=self.timings.get)
+
+    def report(self) -> str:
+        """Таблица таймингов последнего прогона, от самых долгих к быстрым."""
+        lines = [f"{name:<24} {sec * 1000:8.1f} мс" for name, sec in sorted(self.timings.items(), key=lambda kv: -kv[1])]
+        lines.append(f"{'итого (стена)':<24} {self.total_time * 1000:8.1f} мс")
+        return "\n".join(lines)
+
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
     sdk = MyStatSDK("foros_md93", "gHrh7w*6")
     if sdk.login():
         print(sdk.upls_fs())
@@ -0,0 +1,295 @@
+""" Локальный шлюз к MyStat API: один долгоживущий процесс вместо своего MyStatSDK в каждом инструменте.
+
+    Держит по одному MyStatSDK на аккаунт (один токен с фоновым продлением, один кеш
+    в памяти, схлопывание одинаковых запросов) и отдаёт нормализованный JSON по HTTP
+    на 127.0.0.1 или через Unix-сокет. Сколько бы клиентов ни спрашивали одно и то же,
+    в mapi.itstep.org уходит примерно один запрос за TTL эндпоинта (MyStatSDK.CACHE_TTLS);
+    тот же TTL отдаётся клиентам в Cache-Control. Если API не ответило, клиент получает 502
+    без Cache-Control, а не значения по умолчанию ("0%", []), которые закешировал бы у себя.
+
+    GET /v1/accounts                        — логины, которые обслуживает шлюз
+    GET /v1/<логин>/<ресурс>                — grades, progress, leaderboard, homework, attendance, schedule
+    GET /v1/<ресурс>                        — то же, если аккаунт один
+        schedule: ?week=YYYY-MM-DD (неделя с этим днём, по умолчанию текущая) или ?month=YYYY-MM
+    GET /healthz, /metrics, /metrics.json   — состояние и метрики запросов к API
+
+    Запуск: python gateway.py accounts.txt [--port 8765 | --unix /tmp/mystat.sock] [--disk-cache]
+    """
+import argparse
+import json
+import logging
+import os
+import socketserver
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, Callable, Tuple
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from requests.adapters import HTTPAdapter
+
+from collector import parse_accounts
+from core import MyStatSDK, UpstreamError
+from metrics import Metrics
+from ratelimit import RateLimiter
+
+logger = logging.getLogger("MyStatSDK")
+
+
+def _homework(sdk: MyStatSDK, query: Dict[str, str]) -> Dict[str, Any]:
+    done, overdue = (sdk.get_homework() + [0, 0])[:2]
+    return {"done": done, "overdue": overdue, "items": sdk.get_homeworks_list()}
+
+
+def _attendance(sdk: MyStatSDK, query: Dict[str, str]) -> Dict[str, Any]:
+    text = sdk.get_attendance()
+    try:
+        percent = float(str(text).rstrip("%"))
+    except ValueError:
+        percent = None
+    return {"attendance": text, "percent": percent}
+
+
+def _schedule(sdk: MyStatSDK, query: Dict[str, str]) -> Dict[str, Any]:
+    if "month" in query:
+        try:
+            first = date.fromisoformat(query["month"] + "-01")
+        except ValueError:
+            raise ValueError("month: ожидается YYYY-MM")
+        lessons = sdk.get_month_lessons(first.year, first.month)
+    else:
+        try:
+            day = date.fromisoformat(query["week"]) if "week" in query else date.today()
+        except ValueError:
+            raise ValueError("week: ожидается YYYY-MM-DD")
+        lessons = sdk.get_lessons(day.isoformat())
+    return {"lessons": [lesson.to_json() for lesson in lessons]}
+
+
+class Gateway:
+    """
+    Аккаунты и их SDK. Сами SDK создаются лениво, при первом запросе к аккаунту, каждый
+    со своей requests.Session (cookies аккаунтов не смешиваются) поверх общих пула соединений
+    (HTTPAdapter), RateLimiter, Metrics и (если задан) DiskCache.
+    """
+
+    # ресурс -> (EP_* — чей TTL отдавать в Cache-Control, обработчик (sdk, query) -> dict)
+    RESOURCES: Dict[str, Tuple[str, Callable[[MyStatSDK, Dict[str, str]], Dict[str, Any]]]] = {
+        "grades": (MyStatSDK.EP_GRADES, lambda sdk, q: {"grades": sdk.get_grades()}),
+        "progress": (MyStatSDK.EP_PROGRESS, lambda sdk, q: {"average": sdk.get_average_score()}),
+        "leaderboard": (MyStatSDK.EP_LEADERS, lambda sdk, q: {"leaders": sdk.get_leaderboard()}),
+        "homework": (MyStatSDK.EP_HW_COUNT, _homework),
+        "attendance": (MyStatSDK.EP_ATTENDANCE, _attendance),
+        "schedule": (MyStatSDK.EP_SCHEDULE, _schedule),
+    }
+
+    def __init__(
+        self,
+        accounts: Dict[str, str],
+        base_url: Optional[str] = None,
+        proxies: Dict[str, str] = None,
+        adapter: Optional[HTTPAdapter] = None,
+        trust_env: bool = True,
+        disk_cache=None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        """
+        :param accounts: {логин: пароль}
+        :param base_url: корень API (по умолчанию MyStatSDK.BASE_URL)
+        :param proxies: прокси для всех аккаунтов
+        :param adapter: общий пул соединений для сессий аккаунтов; если None — создаётся свой
+        :param trust_env: брать прокси и сертификаты из окружения (requests.Session.trust_env)
+        :param disk_cache: общий постоянный кеш (cache.DiskCache; ключи в нём уже с логином)
+        :param rate_limiter: общий лимит запросов к API (по умолчанию RateLimiter с MyStatSDK.RATE_LIMITS)
+        """
+        self.accounts = dict(accounts)
+        self.base_url = base_url
+        self.proxies = proxies
+        self.disk_cache = disk_cache
+        self.trust_env = trust_env
+        self._owns_adapter = adapter is None
+        self.adapter = adapter or MyStatSDK.make_adapter()
+        self.rate_limiter = rate_limiter or RateLimiter(per_endpoint=MyStatSDK.RATE_LIMITS)
+        self.metrics = Metrics()
+        self._sdks: Dict[str, MyStatSDK] = {}
+        self._lock = threading.Lock()
+        self.client_requests = 0  # сколько запросов пришло от клиентов шлюза
+
+    def close(self) -> None:
+        with self._lock:
+            sdks, self._sdks = list(self._sdks.values()), {}
+        for sdk in sdks:
+            sdk.close()
+        if self._owns_adapter:
+            self.adapter.close()
+
+    def sdk_for(self, username: str) -> MyStatSDK:
+        """SDK аккаунта (создаётся один раз). KeyError — аккаунт шлюзу не известен."""
+        with self._lock:
+            sdk = self._sdks.get(username)
+            if sdk is None:
+                # сессию не закрываем: Session.close() закрыл бы и общий адаптер
+                http = MyStatSDK.make_session(adapter=self.adapter)
+                http.trust_env = self.trust_env
+                sdk = self._sdks[username] = MyStatSDK(
+                    username, self.accounts[username],
+                    proxies=self.proxies,
+                    session=http,
+                    base_url=self.base_url,
+                    disk_cache=self.disk_cache,
+                    rate_limiter=self.rate_limiter,
+                    metrics=self.metrics,
+                )
+            return sdk
+
+    def handle(self, path: str, query: Dict[str, str]) -> Tuple[int, Dict[str, Any], Optional[int]]:
+        """
+        Ответ на GET path (без /v1). Возвращает (HTTP-код, тело, TTL для Cache-Control или None).
+        """
+        with self._lock:
+            self.client_requests += 1
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        if parts == ["accounts"]:
+            return 200, {"accounts": sorted(self.accounts)}, None
+        if len(parts) == 1 and len(self.accounts) == 1:
+            parts = [next(iter(self.accounts))] + parts
+        if len(parts) != 2:
+            return 404, {"error": "ожидается /v1/<логин>/<ресурс>"}, None
+        username, resource = parts
+        if username not in self.accounts:
+            return 404, {"error": f"неизвестный аккаунт: {username}"}, None
+        if resource not in self.RESOURCES:
+            return 404, {"error": f"неизвестный ресурс: {resource}", "resources": list(self.RESOURCES)}, None
+
+        endpoint, fetch = self.RESOURCES[resource]
+        sdk = self.sdk_for(username)
+        # вход — только когда понадобится сеть (его делает SDK): свежий кеш отдаётся и без токена
+        try:
+            with sdk.strict():
+                data = fetch(sdk, query)
+        except ValueError as e:
+            return 400, {"error": str(e)}, None
+        except UpstreamError as e:
+            if not sdk.session_token:
+                return 502, {"error": "не удалось войти в MyStat"}, None
+            return 502, {"error": str(e)}, None
+        return 200, {"account": username, **data}, MyStatSDK.CACHE_TTLS.get(endpoint, MyStatSDK.DEFAULT_CACHE_TTL)
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            logged_in = sum(1 for sdk in self._sdks.values() if sdk.session_token)
+        return {
+            "ok": True,
+            "accounts": len(self.accounts),
+            "logged_in": logged_in,
+            "client_requests": self.client_requests,
+        }
+
+
+class _GatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive для клиентов, опрашивающих шлюз
+
+    def _send(self, code: int, body: bytes, ctype: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, code: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send(code, json.dumps(body, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8", headers)
+
+    def do_GET(self):
+        gateway: Gateway = self.server.gateway
+        parts = urlsplit(self.path)
+        if parts.path == "/healthz":
+            self._send_json(200, gateway.health())
+        elif parts.path == "/metrics":
+            self._send(200, gateway.metrics.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        elif parts.path == "/metrics.json":
+            self._send(200, gateway.metrics.to_json().encode("utf-8"), "application/json")
+        elif parts.path.startswith("/v1/"):
+            query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            try:
+                code, body, ttl = gateway.handle(parts.path[len("/v1"):], query)
+            except Exception as e:
+                logger.exception("Шлюз: ошибка обработки %s", self.path)
+                code, body, ttl = 500, {"error": str(e)}, None
+            self._send_json(code, body, {"Cache-Control": f"max-age={ttl}"} if ttl else None)
+        else:
+            self._send_json(404, {"error": "не найдено"})
+
+    def address_string(self) -> str:
+        # у Unix-сокета client_address — пустая строка
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, fmt, *args):
+        logger.debug("Шлюз: %s - %s", self.address_string(), fmt % args)
+
+
+class _UnixGatewayServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(gateway: Gateway, port: int = 8765, host: str = "127.0.0.1", unix_socket: Optional[str] = None):
+    """
+    HTTP-сервер шлюза (ещё не запущен — server.serve_forever()).
+    :param unix_socket: путь Unix-сокета; если задан, host/port не используются
+    """
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)  # сокет от прошлого запуска
+        # данные аккаунтов — только владельцу, и уже в момент bind() (umask 077):
+        # chmod после него оставлял бы окно, когда подключиться могут другие пользователи
+        umask = os.umask(0o077)
+        try:
+            server = _UnixGatewayServer(unix_socket, _GatewayHandler)
+        finally:
+            os.umask(umask)
+    else:
+        server = ThreadingHTTPServer((host, port), _GatewayHandler)
+        server.daemon_threads = True
+    server.gateway = gateway
+    return server
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("accounts", help="файл аккаунтов, как у collector.py (логин:пароль по строке)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--unix", help="слушать Unix-сокет вместо TCP")
+    p.add_argument("--base-url", default=None, help="корень API (по умолчанию " + MyStatSDK.BASE_URL + ")")
+    p.add_argument("--disk-cache", nargs="?", const="", default=None,
+                   help="постоянный кеш ответов (путь; без значения — ~/.mystat/cache.sqlite3)")
+    p.add_argument("-v", "--verbose", action="store_true", help="логи SDK и запросов к шлюзу")
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(levelname)s: %(message)s")
+
+    with open(args.accounts, encoding="utf-8") as f:
+        accounts = dict(parse_accounts(f))
+    if not accounts:
+        p.error("в файле нет ни одного аккаунта")
+
+    disk_cache = None
+    if args.disk_cache is not None:
+        from cache import DiskCache
+
+        disk_cache = DiskCache(args.disk_cache or None)
+
+    gateway = Gateway(accounts, base_url=args.base_url, disk_cache=disk_cache)
+    server = create_server(gateway, args.port, args.host, args.unix)
+    where = args.unix or f"http://{args.host}:{server.server_address[1]}/v1/"
+    print(f"MyStat gateway: {where} (аккаунтов: {len(accounts)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        gateway.close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
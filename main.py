@@ -1,21 +1,81 @@
 # main_sidebar.py
+import time
+
+_T0 = time.perf_counter()  # начало импорта — точка отсчёта StartupTimer
+
+import hashlib
+import json
+import logging
+import os
+import random
 import sys
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QFrame, QListWidget, QGridLayout, QPushButton, QStackedWidget, QTextEdit,
-    QSizePolicy, QScrollArea, QDialog, QFileDialog, QCalendarWidget, QToolButton
+    QSizePolicy, QDialog, QFileDialog, QCalendarWidget, QToolButton, QProgressBar,
+    QShortcut, QListView, QStyledItemDelegate, QStyle
 )
-from PyQt5.QtCore import Qt, QRunnable, QThreadPool, pyqtSignal, QObject, QDate, QLocale
-from PyQt5.QtGui import QFont, QTextCharFormat, QColor, QIcon
-from datetime import datetime, timedelta
-from core import MyStatSDK
-from typing import List
+from PyQt5.QtCore import (
+    Qt, QRunnable, QThreadPool, pyqtSignal, QObject, QDate, QLocale, QTimer,
+    QAbstractListModel, QModelIndex, QSize, QRectF, QPointF, QEvent
+)
+from PyQt5.QtGui import QFont, QTextCharFormat, QColor, QIcon, QKeySequence, QPainter
+from datetime import date, timedelta
+from difflib import SequenceMatcher
+from typing import List, TYPE_CHECKING
+
+# core (requests/urllib3), cache (sqlite3) и metrics (http.server) импортируются лениво:
+# окно должно появиться раньше, чем они загрузятся
+if TYPE_CHECKING:
+    from core import MyStatSDK
+
+logger = logging.getLogger("MyStatSDK")
+
+
+class StartupTimer:
+    """
+    Отметки времени запуска (мс от начала импорта main.py) и бюджет time-to-interactive.
+    Отметки: imports, window_created, window_shown, sdk_ready, first_data, data_loaded.
+    """
+
+    # бюджеты, мс от старта; превышение — предупреждение в логе
+    BUDGETS = {"window_shown": 500, "first_data": 1500}
+
+    def __init__(self, t0: float = None):
+        self.t0 = _T0 if t0 is None else t0
+        self.marks = {}
+
+    def mark(self, name: str) -> bool:
+        """Запоминает первую отметку name. True — если она новая."""
+        if name in self.marks:
+            return False
+        self.marks[name] = (time.perf_counter() - self.t0) * 1000
+        return True
+
+    def report(self) -> str:
+        lines = ["запуск (мс от старта):"]
+        for name, ms in sorted(self.marks.items(), key=lambda kv: kv[1]):
+            budget = self.BUDGETS.get(name)
+            over = f"  > бюджета {budget} мс" if budget is not None and ms > budget else ""
+            lines.append(f"  {name:<16} {ms:8.1f}{over}")
+        return "\n".join(lines)
+
+    def log_report(self) -> None:
+        logger.info("%s", self.report())
+        for name, budget in self.BUDGETS.items():
+            if self.marks.get(name, 0) > budget:
+                logger.warning("Запуск: %s за %.0f мс при бюджете %d мс", name, self.marks[name], budget)
 
 
 # ---- Worker helpers ----
 class WorkerSignals(QObject):
     finished = pyqtSignal(object)
     error = pyqtSignal(str)
+    section = pyqtSignal(str, object)  # промежуточный результат: (имя секции, данные)
+    progress = pyqtSignal(object, object)  # (сделано, всего) — object, чтобы не упереться в int32 на больших файлах
 
 
 class Worker(QRunnable):
@@ -58,63 +118,388 @@ class Card(QFrame):
         layout.addStretch()
 
     def set_value(self, value):
-        self.value_label.setText(str(value))
-
-
-def get_monday_of_week(date: datetime) -> str:
-    monday = date - timedelta(days=date.weekday())
-    return monday.strftime("%Y-%m-%d")
-
-
-class HomeworkCard(QFrame):
-    def __init__(self, hw_id, title, on_click=None):
-        super().__init__()
-        self.hw_id = hw_id
-        self.title = title
-        self.setFixedSize(200, 120)
-        self.setStyleSheet("""
-            QFrame {
-                background-color: #f5f5ff;
-                border-radius: 12px;
-                padding: 10px;
-            }
-            QLabel {
-                color: #333;
-                font-size: 13px;
-                font-weight: bold;
-            }
-            QPushButton {
-                background-color: #e0bbff;
-                border: none;
-                border-radius: 6px;
-                padding: 5px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #d1aaff;
-            }
-        """)
-
-        layout = QVBoxLayout(self)
-        layout.setAlignment(Qt.AlignCenter)
-        self.label = QLabel(title)
-        self.label.setAlignment(Qt.AlignCenter)
-        self.btn = QPushButton("Открыть")
-        layout.addWidget(self.label)
-        layout.addStretch()
-        layout.addWidget(self.btn)
+        text = str(value)
+        if self.value_label.text() != text:
+            self.value_label.setText(text)
+        self.set_stale(False)
+
+    def set_stale(self, stale: bool):
+        """Приглушает значение, пока показаны устаревшие данные."""
+        style = "color: #9e9e9e;" if stale else ""
+        if self.value_label.styleSheet() != style:  # setStyleSheet пересчитывает стиль даже без изменений
+            self.value_label.setStyleSheet(style)
+
+
+class CalendarHighlighter:
+    """
+    Подсветка дат QCalendarWidget по классам (уроки, сроки ДЗ, экзамены).
+    Помнит, какой формат реально выставлен каждой дате, и трогает только даты сетки
+    показанного месяца (6 недель), у которых набор классов поменялся; старые форматы
+    снимаются. Сколько бы месяцев данных ни было в памяти, обновление стоит ~42 дня.
+    """
+
+    # класс -> (фон, цвет текста, подчёркивание); при совпадении дат применяются по порядку
+    CLASSES = {
+        "lessons": ("#e6f0ff", "#000000", False),
+        "deadlines": (None, "#c0392b", True),
+        "exams": ("#ffe0b2", "#000000", False),
+    }
+    GRID_DAYS = 42  # QCalendarWidget всегда показывает 6 недель
+
+    def __init__(self, calendar: QCalendarWidget):
+        self.calendar = calendar
+        self._dates = {name: set() for name in self.CLASSES}  # все известные даты по классам
+        self._applied = {}  # datetime.date -> frozenset классов, выставленный в календаре
+        self._formats = {}  # frozenset классов -> QTextCharFormat
+        calendar.currentPageChanged.connect(lambda year, month: self.refresh())
+
+    def set_dates(self, name: str, dates) -> None:
+        """Полностью заменить даты класса name."""
+        self._dates[name] = set(dates)
+        self.refresh()
+
+    def update(self, name: str, added=(), removed=()) -> None:
+        """Добавить и убрать даты класса name; календарь трогается, только если они видны."""
+        first, last = self.grid_range()
+        marks = self._dates[name]
+        touched = False
+        for day in removed:
+            marks.discard(day)
+            touched = touched or first <= day <= last
+        for day in added:
+            marks.add(day)
+            touched = touched or first <= day <= last
+        if touched:
+            self.refresh()
+
+    def grid_range(self):
+        """Первая и последняя даты сетки показанного месяца."""
+        first = date(self.calendar.yearShown(), self.calendar.monthShown(), 1)
+        # как в QCalendarModel: если 1-е число попадает в первый столбец, месяц начинается со второй строки
+        offset = (first.isoweekday() - int(self.calendar.firstDayOfWeek())) % 7 or 7
+        start = first - timedelta(days=offset)
+        return start, start + timedelta(days=self.GRID_DAYS - 1)
+
+    def refresh(self) -> None:
+        """Привести форматы сетки показанного месяца к текущим данным."""
+        start, _ = self.grid_range()
+        wanted = {}
+        for i in range(self.GRID_DAYS):
+            day = start + timedelta(days=i)
+            classes = frozenset(name for name, marks in self._dates.items() if day in marks)
+            if classes:
+                wanted[day] = classes
+        for day in self._applied.keys() - wanted.keys():
+            self.calendar.setDateTextFormat(QDate(day), QTextCharFormat())
+        for day, classes in wanted.items():
+            if self._applied.get(day) != classes:
+                self.calendar.setDateTextFormat(QDate(day), self._format(classes))
+        self._applied = wanted
+
+    def _format(self, classes) -> QTextCharFormat:
+        fmt = self._formats.get(classes)
+        if fmt is None:
+            fmt = QTextCharFormat()
+            fmt.setFontWeight(QFont.Bold)
+            for name, (background, foreground, underline) in self.CLASSES.items():
+                if name not in classes:
+                    continue
+                if background:
+                    fmt.setBackground(QColor(background))
+                fmt.setForeground(QColor(foreground))
+                if underline:
+                    fmt.setFontUnderline(True)
+            self._formats[classes] = fmt
+        return fmt
+
+
+class RefreshScheduler(QObject):
+    """
+    Фоновое обновление секций, у каждой свой интервал. Один QTimer взводится на ближайший срок.
+    Интервал растягивается, пока окно скрыто (HIDDEN_FACTOR), и удваивается (до MAX_BACKOFF),
+    пока сервер отвечает медленно или с ошибкой; к каждому сроку добавляется разброс ±JITTER,
+    чтобы много клиентов не приходили за данными в одну и ту же секунду.
+    Создаётся на паузе: resume() после первой полной загрузки.
+    """
+
+    HIDDEN_FACTOR = 6  # во сколько раз реже обновлять свёрнутое/скрытое окно
+    SLOW_SECONDS = 3.0  # обновление дольше этого считается признаком перегруженного сервера
+    MAX_BACKOFF = 8  # предел растяжения интервала из-за медленных ответов и ошибок
+    JITTER = 0.15  # доля случайного разброса срока
+
+    def __init__(self, intervals, run, is_hidden, parent=None):
+        """
+        :param intervals: {секция: базовый интервал, сек}
+        :param run: run(секция, done) — запускает обновление; done(ok) вызывается в UI-потоке по окончании
+        :param is_hidden: функция без аргументов — скрыто ли окно
+        """
+        super().__init__(parent)
+        self.intervals = dict(intervals)
+        self._run = run
+        self._is_hidden = is_hidden
+        self._last = {}  # секция -> time.monotonic() последнего обновления
+        self._jitter = {}  # секция -> множитель разброса текущего срока
+        self.backoff = {name: 1 for name in self.intervals}
+        self._running = {}  # секция -> время запуска
+        self._paused = True
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._tick)
+
+    def pause(self) -> None:
+        """Остановить плановые обновления (например, на время ручного «Обновить»)."""
+        self._paused = True
+        self._timer.stop()
+
+    def resume(self, fresh=()) -> None:
+        """
+        Продолжить плановые обновления.
+        :param fresh: секции, которые только что обновлены целиком — их сроки отсчитываются заново
+        """
+        self.mark_fresh(fresh)
+        self._paused = False
+        self.reschedule()
+
+    def mark_fresh(self, names) -> None:
+        now = time.monotonic()
+        for name in names:
+            if name in self.intervals:
+                self._last[name] = now
+                self._jitter[name] = 1 + random.uniform(-self.JITTER, self.JITTER)
+
+    def interval(self, name: str) -> float:
+        """Текущий интервал секции с учётом видимости окна и замедления, без разброса."""
+        factor = self.backoff[name] * (self.HIDDEN_FACTOR if self._is_hidden() else 1)
+        return self.intervals[name] * factor
+
+    def due_in(self, name: str) -> float:
+        """Сколько секунд до планового обновления секции (0 — пора)."""
+        last = self._last.get(name)
+        if last is None:
+            return 0.0
+        return max(0.0, last + self.interval(name) * self._jitter.get(name, 1) - time.monotonic())
+
+    def reschedule(self) -> None:
+        """Перевзвести таймер на ближайший срок (и после смены видимости окна)."""
+        waiting = [self.due_in(name) for name in self.intervals if name not in self._running]
+        if self._paused or not waiting:
+            self._timer.stop()
+            return
+        self._timer.start(int(min(waiting) * 1000))
 
-        if on_click:
-            self.btn.clicked.connect(lambda: on_click(self.hw_id, self.title))
+    def _tick(self) -> None:
+        if self._paused:
+            return
+        for name in self.intervals:
+            if name not in self._running and self.due_in(name) == 0:
+                self._running[name] = time.monotonic()
+                self._run(name, lambda ok, name=name: self._done(name, ok))
+        self.reschedule()
+
+    def _done(self, name: str, ok: bool) -> None:
+        elapsed = time.monotonic() - self._running.pop(name, time.monotonic())
+        if not ok or elapsed > self.SLOW_SECONDS:
+            self.backoff[name] = min(self.MAX_BACKOFF, self.backoff[name] * 2)
+            logger.info("Автообновление %s: %s за %.1f c, интервал x%d", name,
+                        "ошибка" if not ok else "медленно", elapsed, self.backoff[name])
+        else:
+            self.backoff[name] = 1
+        self.mark_fresh([name])
+        self.reschedule()
+
+    def report(self) -> str:
+        lines = ["автообновление" + (" (пауза)" if self._paused else "") + ":"]
+        for name in self.intervals:
+            state = "обновляется" if name in self._running else f"через {format_duration(self.due_in(name))}"
+            lines.append(f"  {name:<16} каждые {format_duration(self.interval(name))}, {state}")
+        return "\n".join(lines)
+
+
+def to_jsonable(value):
+    """Объекты SDK с to_json() (LessonSchedule, Lesson) -> JSON-совместимые данные; остальное как есть."""
+    if hasattr(value, "to_json"):
+        return value.to_json()
+    return value
+
+
+def _json_default(obj):
+    return obj.to_json() if hasattr(obj, "to_json") else str(obj)
+
+
+def section_digest(value) -> bytes:
+    """Отпечаток данных секции: одинаковые данные — одинаковый отпечаток, секцию можно не трогать."""
+    raw = json.dumps(value, sort_keys=True, ensure_ascii=False, default=_json_default).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def list_changes(old, new):
+    """
+    Правки, превращающие список old в new, с конца к началу (индексы впереди не сдвигаются):
+    ('replace' | 'delete' | 'insert', i1, i2, j1, j2) — как SequenceMatcher.get_opcodes, без 'equal'.
+    """
+    ops = SequenceMatcher(None, old, new, autojunk=False).get_opcodes()
+    return [op for op in reversed(ops) if op[0] != "equal"]
+
+
+def format_lesson(lesson) -> str:
+    """Строка урока для списка дня: '09:00–10:30  Python  (ауд. 201, Иванов И.)'."""
+    if lesson.start and lesson.end:
+        when = f"{lesson.start:%H:%M}–{lesson.end:%H:%M}"
+    elif lesson.start:
+        when = f"{lesson.start:%H:%M}"
+    else:
+        when = f"{lesson.number} пара" if lesson.number is not None else ""
+    extra = ", ".join(x for x in (f"ауд. {lesson.room}" if lesson.room else "", lesson.teacher or "") if x)
+    line = f"{when}  {lesson.subject or 'Без названия'}".strip()
+    return f"{line}  ({extra})" if extra else line
+
+
+def format_age(seconds: float) -> str:
+    """Возраст данных по-человечески: 'только что', '5 мин назад', '3 ч назад'..."""
+    if seconds < 60:
+        return "только что"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} мин назад"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} ч назад"
+    return f"{int(seconds // 86400)} дн назад"
+
+
+def format_duration(seconds: float) -> str:
+    """Промежуток времени коротко: '45 с', '5 мин', '3 ч', '1 дн'."""
+    if seconds < 60:
+        return f"{int(seconds)} с"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} мин"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} ч"
+    return f"{int(seconds // 86400)} дн"
+
+
+class HomeworkModel(QAbstractListModel):
+    """
+    Список ДЗ для HomeworkView: только данные, без виджетов.
+    set_items() обновляет модель на месте: по diff списков id вставляет и удаляет только
+    изменившиеся строки, у совпавших id с новым заголовком шлёт dataChanged.
+    """
+
+    IdRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items = []  # [(id, title)]
+
+    @staticmethod
+    def _normalize(homeworks):
+        items = []
+        for hw in homeworks or []:
+            if isinstance(hw, dict):
+                items.append((hw.get("id"), str(hw.get("title") or "")))
+            else:
+                items.append((None, str(hw)))
+        return items
+
+    def set_items(self, homeworks):
+        items = self._normalize(homeworks)
+        old_ids = [i[0] for i in self._items]
+        new_ids = [i[0] for i in items]
+        for tag, i1, i2, j1, j2 in list_changes(old_ids, new_ids):
+            if tag in ("replace", "delete"):
+                self.beginRemoveRows(QModelIndex(), i1, i2 - 1)
+                del self._items[i1:i2]
+                self.endRemoveRows()
+            if tag in ("replace", "insert"):
+                self.beginInsertRows(QModelIndex(), i1, i1 + j2 - j1 - 1)
+                self._items[i1:i1] = items[j1:j2]
+                self.endInsertRows()
+        # id совпадают построчно — осталось обновить поменявшиеся заголовки
+        for row, (before, after) in enumerate(zip(self._items, items)):
+            if before != after:
+                self._items[row] = after
+                idx = self.index(row)
+                self.dataChanged.emit(idx, idx)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._items):
+            return None
+        hw_id, title = self._items[index.row()]
+        if role == Qt.DisplayRole:
+            return title
+        if role == self.IdRole:
+            return hw_id
+        return None
+
+
+class HomeworkDelegate(QStyledItemDelegate):
+    """
+    Рисует карточку ДЗ (заголовок + кнопка «Открыть») прямо на viewport — без QFrame/QLabel/QPushButton
+    на каждую запись. Qt вызывает paint только для видимых карточек.
+    """
+
+    CARD_SIZE = QSize(200, 120)
+    SPACING = 10
+    BUTTON_HEIGHT = 28
+    clicked = pyqtSignal(object, str)  # (id ДЗ, заголовок) — нажата кнопка «Открыть»
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.title_font = QFont("Segoe UI")
+        self.title_font.setPixelSize(13)
+        self.title_font.setBold(True)
+        self.button_font = QFont("Segoe UI")
+        self.button_font.setPixelSize(12)
+
+    def sizeHint(self, option, index):
+        return self.CARD_SIZE
+
+    def _card_rect(self, option):
+        return QRectF(option.rect).adjusted(0.5, 0.5, -0.5, -0.5)
+
+    def _button_rect(self, option):
+        card = option.rect
+        return QRectF(card.left() + 10, card.bottom() - 10 - self.BUTTON_HEIGHT, card.width() - 20, self.BUTTON_HEIGHT)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        hovered = bool(option.state & QStyle.State_MouseOver)
+        painter.setPen(QColor("#d1aaff") if option.state & QStyle.State_HasFocus else Qt.NoPen)
+        painter.setBrush(QColor("#f5f5ff"))
+        painter.drawRoundedRect(self._card_rect(option), 12, 12)
+
+        button = self._button_rect(option)
+        text_rect = QRectF(option.rect).adjusted(10, 10, -10, -(self.BUTTON_HEIGHT + 20))
+        painter.setPen(QColor("#333"))
+        painter.setFont(self.title_font)
+        painter.drawText(text_rect, Qt.AlignCenter | Qt.TextWordWrap, index.data(Qt.DisplayRole) or "")
+
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor("#d1aaff" if hovered else "#e0bbff"))
+        painter.drawRoundedRect(button, 6, 6)
+        painter.setPen(QColor("#000"))
+        painter.setFont(self.button_font)
+        painter.drawText(button, Qt.AlignCenter, "Открыть")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+                and self._button_rect(option).contains(QPointF(event.pos()))):
+            self.clicked.emit(index.data(HomeworkModel.IdRole), index.data(Qt.DisplayRole) or "")
+            return True
+        return super().editorEvent(event, model, option, index)
 
 
 class HomeworkDialog(QDialog):
-    def __init__(self, hw_id, title, sdk, parent=None):
+    def __init__(self, hw_id, title, sdk: "MyStatSDK", parent=None):
         super().__init__(parent)
         self.hw_id = hw_id
         self.sdk = sdk
         self.hw_title = title
         self.selected_file = None  # выбранный файл
+        self._cancel_upload = None  # threading.Event текущей загрузки
 
         self.setWindowTitle("Домашнее задание")
         self.setMinimumWidth(420)
@@ -160,12 +545,23 @@ class HomeworkDialog(QDialog):
         self.comment.setPlaceholderText("Введите комментарий...")
         layout.addWidget(self.comment)
 
-        btn_send = QPushButton("Отправить")
-        layout.addWidget(btn_send)
+        self.upload_progress = QProgressBar()
+        self.upload_progress.setRange(0, 1000)
+        self.upload_progress.setTextVisible(False)
+        self.upload_progress.hide()
+        layout.addWidget(self.upload_progress)
+
+        self.btn_send = QPushButton("Отправить")
+        layout.addWidget(self.btn_send)
+
+        self.btn_cancel_upload = QPushButton("Отменить загрузку")
+        self.btn_cancel_upload.hide()
+        layout.addWidget(self.btn_cancel_upload)
+        self.btn_cancel_upload.clicked.connect(self.cancel_upload)
 
         btn_open.clicked.connect(self.open_task)
         btn_file.clicked.connect(self.select_file)
-        btn_send.clicked.connect(self.send_homework)
+        self.btn_send.clicked.connect(self.send_homework)
 
     def open_task(self):
         try:
@@ -187,24 +583,103 @@ class HomeworkDialog(QDialog):
             return
 
         comment = self.comment.toPlainText()
-        try:
-            self.sdk.upload_homework(self.hw_id, self.selected_file, comment)
+        # загрузка в фоне: окно не подвисает, видно прогресс, можно отменить
+        self._cancel_upload = threading.Event()
+        worker = Worker(self.sdk.upload_homework, self.hw_id, self.selected_file, comment)
+        worker.kwargs["progress"] = worker.signals.progress.emit
+        worker.kwargs["cancel"] = self._cancel_upload
+        worker.signals.progress.connect(self._on_upload_progress)
+        worker.signals.finished.connect(self._on_upload_finished)
+        worker.signals.error.connect(self._on_upload_error)
+        self._set_uploading(True)
+        QThreadPool.globalInstance().start(worker)
+
+    def cancel_upload(self):
+        if self._cancel_upload is not None:
+            self._cancel_upload.set()
+
+    def reject(self):
+        # закрытие окна во время загрузки отменяет её
+        self.cancel_upload()
+        super().reject()
+
+    def _set_uploading(self, uploading):
+        self.btn_send.setEnabled(not uploading)
+        self.upload_progress.setValue(0)
+        self.upload_progress.setVisible(uploading)
+        self.btn_cancel_upload.setVisible(uploading)
+
+    def _on_upload_progress(self, sent, total):
+        if total:
+            self.upload_progress.setValue(int(sent * 1000 / total))
+
+    def _on_upload_finished(self, ok):
+        self._set_uploading(False)
+        self._cancel_upload = None
+        if ok:
             print("ДЗ успешно отправлено")
             self.accept()
-        except Exception as e:
-            print(f"Ошибка при отправке ДЗ: {e}")
+
+    def _on_upload_error(self, message):
+        self._set_uploading(False)
+        self._cancel_upload = None
+        print(f"Ошибка при отправке ДЗ: {message}")
 
 
 # ---- Main App ----
 class MyStatApp(QMainWindow):
-    def __init__(self, sdk: MyStatSDK):
+    # что при нажатии «Обновить» брать из сети мимо кеша (sdk.revalidate())
+    # (имена EP_* констант MyStatSDK — core импортируется лениво, после показа окна)
+    REFRESH_INVALIDATE = ("EP_HW_COUNT", "EP_HW_LIST", "EP_ATTENDANCE")
+    # секции дашборда в порядке отрисовки; каждой соответствует метод _render_<имя>
+    # (расписание сюда не входит — оно грузится помесячно, см. _ensure_months)
+    SECTIONS = ("homework", "avg", "attendance", "leaders", "homeworks_list")
+    SNAPSHOT_TTL = 30 * 86400  # сколько хранить последний снимок дашборда для мгновенного старта
+    PAGE_DASHBOARD, PAGE_SCHEDULE, PAGE_HOMEWORK, PAGE_DIAGNOSTICS = range(4)
+    # секции, которые рисуются не на дашборде: пока страница не построена, данные ждут в _pending_sections
+    SECTION_PAGES = {"schedule": PAGE_SCHEDULE, "homeworks_list": PAGE_HOMEWORK}
+    DIAGNOSTICS_SHORTCUT = "Ctrl+Shift+D"  # скрытая страница диагностики (в боковой панели её нет)
+    DIAGNOSTICS_INTERVAL = 1000  # мс — обновление страницы диагностики, пока она открыта
+    MONTH_CACHE_SIZE = 5  # сколько месяцев расписания держать в памяти (видимый и соседние не вытесняются)
+    # откуда секция дашборда берёт данные: (метод MyStatSDK, EP_* — сверяется с REFRESH_INVALIDATE)
+    SECTION_SOURCES = {
+        "homework": ("get_homework", "EP_HW_COUNT"),
+        "homeworks_list": ("get_homeworks_list", "EP_HW_LIST"),
+        "avg": ("get_average_score", "EP_PROGRESS"),
+        "leaders": ("get_leaderboard", "EP_LEADERS"),
+        "attendance": ("get_attendance", "EP_ATTENDANCE"),
+    }
+    # фоновое обновление: секция -> базовый интервал, сек (растягивается RefreshScheduler)
+    AUTO_REFRESH = {
+        "homework": 5 * 60,
+        "attendance": 5 * 60,
+        "homeworks_list": 10 * 60,
+        "avg": 60 * 60,
+        "leaders": 60 * 60,
+        "schedule": 24 * 3600,
+    }
+
+    def __init__(self, sdk: "MyStatSDK" = None, sdk_factory=None, startup: "StartupTimer" = None):
+        """
+        :param sdk: готовый MyStatSDK
+        :param sdk_factory: функция без аргументов, создающая SDK; вызывается в фоне после
+                            первой отрисовки окна (тогда core и requests не нужны для старта)
+        :param startup: отметки времени запуска (по умолчанию — новый StartupTimer)
+        """
         super().__init__()
         self.sdk = sdk
+        self._sdk_factory = sdk_factory
+        self.startup = startup or StartupTimer()
         self.setWindowTitle("MyStat Dashboard")
         self.setGeometry(200, 100, 1200, 680)
         self.setStyleSheet("background-color: white;")
         self.setWindowIcon(QIcon("favicon.ico"))
-        self._schedule_by_date = {}
+        self._schedule_by_date = None  # core.LessonSchedule последних показанных данных
+        self._deadline_dates = set()  # сроки сдачи ДЗ (datetime.date) из последнего списка ДЗ
+        self._months = OrderedDict()  # (год, месяц) -> список core.Lesson; порядок — давность использования
+        self._months_loading = set()  # месяцы, запрос которых уже в пути
+        self._data_time = None  # когда получены данные, показанные сейчас (None — данных нет)
+        self._last_data = None  # последние данные дашборда (для снимка после планового обновления секции)
 
         main_widget = QWidget()
         main_layout = QHBoxLayout(main_widget)
@@ -261,6 +736,12 @@ class MyStatApp(QMainWindow):
         page_dashboard = QWidget()
         dash_layout = QVBoxLayout(page_dashboard)
 
+        # плашка «устаревшие данные» — видна, пока идёт фоновое обновление
+        self.stale_label = QLabel("")
+        self.stale_label.setStyleSheet("color: #8a6d00; background-color: #fff8e1; border-radius: 6px; padding: 4px 8px;")
+        self.stale_label.hide()
+        dash_layout.addWidget(self.stale_label)
+
         self.cards_layout = QGridLayout()
         self.card_tasks = Card("ДЗ", "—", "#e0bbff")
         self.card_overdue = Card("Просрочено", "—", "#ffcccc", "#800000")
@@ -281,9 +762,92 @@ class MyStatApp(QMainWindow):
         dash_layout.addWidget(self.leader_list)
         self.pages.addWidget(page_dashboard)
 
-        # Page 2: Schedule (calendar view)
-        page_schedule = QWidget()
-        sched_layout = QVBoxLayout(page_schedule)
+        # остальные страницы — пустые контейнеры, содержимое строится при первом показе (_ensure_page)
+        self._page_builders = {
+            self.PAGE_SCHEDULE: self._build_schedule_page,
+            self.PAGE_HOMEWORK: self._build_homework_page,
+            self.PAGE_DIAGNOSTICS: self._build_diagnostics_page,
+        }
+        self._built_pages = {self.PAGE_DASHBOARD}
+        for _ in self._page_builders:
+            self.pages.addWidget(QWidget())
+        self.page_diag = self.pages.widget(self.PAGE_DIAGNOSTICS)
+        self._pending_sections = {}  # секции недостроенных страниц: имя -> последние данные
+        self._section_digests = {}  # имя секции -> section_digest последних принятых данных
+
+        # signals
+        self.btn_main.clicked.connect(lambda: self.pages.setCurrentIndex(self.PAGE_DASHBOARD))
+        self.btn_schedule.clicked.connect(lambda: self.pages.setCurrentIndex(self.PAGE_SCHEDULE))
+        self.btn_hw.clicked.connect(lambda: self.pages.setCurrentIndex(self.PAGE_HOMEWORK))
+        self.btn_refresh.clicked.connect(self.load_all_data)
+        self.pages.currentChanged.connect(self._on_page_changed)
+
+        QShortcut(QKeySequence(self.DIAGNOSTICS_SHORTCUT), self, activated=self.show_diagnostics)
+        self.diag_timer = QTimer(self)
+        self.diag_timer.setInterval(self.DIAGNOSTICS_INTERVAL)
+        self.diag_timer.timeout.connect(self.update_diagnostics)
+
+        self.pool = QThreadPool.globalInstance()
+        self.fetch_planner = None
+        self.auto_refresh = RefreshScheduler(self.AUTO_REFRESH, self._auto_refresh_section, self._is_hidden, self)
+        # до готовности SDK обновлять нечего
+        self.btn_refresh.setEnabled(False)
+        self._first_shown = False
+        self.startup.mark("window_created")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._first_shown:
+            self._first_shown = True
+            # сеть, тяжёлые импорты и снимок — только после первой отрисовки окна
+            QTimer.singleShot(0, self._on_first_shown)
+        self.auto_refresh.reschedule()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.auto_refresh.reschedule()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self.auto_refresh.reschedule()  # свернули/развернули — интервалы меняются
+
+    def _is_hidden(self):
+        return not self.isVisible() or self.isMinimized()
+
+    def _on_first_shown(self):
+        self.startup.mark("window_shown")
+        if self.sdk is not None:
+            self._on_sdk_ready(self.sdk)
+            return
+        # core тянет requests/urllib3 — импорт и создание SDK в фоне, окно уже отвечает
+        worker = Worker(self._sdk_factory)
+        worker.signals.finished.connect(self._on_sdk_ready)
+        worker.signals.error.connect(self._on_error)
+        self.pool.start(worker)
+
+    def _on_sdk_ready(self, sdk):
+        from core import FetchPlanner  # к этому моменту core уже импортирован
+
+        self.sdk = sdk
+        self.fetch_planner = FetchPlanner()
+        self.startup.mark("sdk_ready")
+        self.load_all_data()
+        self._ensure_months()
+
+    # ---- lazy pages ----
+    def _ensure_page(self, index):
+        """Строит содержимое страницы при первом показе и дорисовывает отложенные секции."""
+        if index in self._built_pages or index not in self._page_builders:
+            return
+        self._built_pages.add(index)
+        self._page_builders[index](self.pages.widget(index))
+        for name, page in self.SECTION_PAGES.items():
+            if page == index and name in self._pending_sections:
+                getattr(self, f"_render_{name}")(self._pending_sections.pop(name))
+
+    def _build_schedule_page(self, page):
+        sched_layout = QVBoxLayout(page)
 
         # top nav (prev / month label / next)
         nav_layout = QHBoxLayout()
@@ -314,211 +878,414 @@ class MyStatApp(QMainWindow):
             }
         """)
         sched_layout.addWidget(self.calendar)
+        self.calendar_marks = CalendarHighlighter(self.calendar)
+        self.calendar_marks.set_dates("deadlines", self._deadline_dates)
 
         # lessons list for selected day
         self.schedule_list = QListWidget()
         sched_layout.addWidget(self.schedule_list)
 
-        self.pages.addWidget(page_schedule)
-
-        # Page 3: Homework
-        page_hw = QWidget()
-        hw_layout = QVBoxLayout(page_hw)
-        hw_label = QLabel("Домашние задания")
-        hw_label.setFont(QFont("Segoe UI", 12, QFont.Bold))
-        hw_layout.addWidget(hw_label)
-
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
-        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-
-        scroll_content = QWidget()
-        self.hw_container = QGridLayout(scroll_content)
-        self.hw_container.setContentsMargins(10, 10, 10, 10)
-        self.hw_container.setSpacing(10)
-
-        scroll_area.setWidget(scroll_content)
-        hw_layout.addWidget(scroll_area)
-        self.pages.addWidget(page_hw)
-
-        # signals
-        self.btn_main.clicked.connect(lambda: self.pages.setCurrentIndex(0))
-        self.btn_schedule.clicked.connect(lambda: self.pages.setCurrentIndex(1))
-        self.btn_hw.clicked.connect(lambda: self.pages.setCurrentIndex(2))
-        self.btn_refresh.clicked.connect(self.load_all_data)
-
         self.prev_btn.clicked.connect(lambda: self.shift_month(-1))
         self.next_btn.clicked.connect(lambda: self.shift_month(1))
         self.calendar.selectionChanged.connect(self.show_day_lessons)
-
-        self.pool = QThreadPool.globalInstance()
-        self.load_all_data()
+        # любая смена показанного месяца (кнопки, клавиатура, клик по дню соседнего месяца)
+        self.calendar.currentPageChanged.connect(lambda year, month: self._ensure_months())
 
         # установить начальную метку месяца
         self.update_month_label()
+        self._ensure_months()
+        self.show_day_lessons()
+
+    def _build_homework_page(self, page):
+        hw_layout = QVBoxLayout(page)
+        hw_label = QLabel("Домашние задания")
+        hw_label.setFont(QFont("Segoe UI", 12, QFont.Bold))
+        hw_layout.addWidget(hw_label)
+
+        # сетка карточек: модель + делегат, рисуются только видимые карточки
+        self.hw_model = HomeworkModel(self)
+        self.hw_delegate = HomeworkDelegate(self)
+        self.hw_view = QListView()
+        self.hw_view.setViewMode(QListView.IconMode)
+        self.hw_view.setMovement(QListView.Static)
+        self.hw_view.setResizeMode(QListView.Adjust)
+        self.hw_view.setWrapping(True)
+        self.hw_view.setUniformItemSizes(True)  # раскладка не опрашивает sizeHint каждой записи
+        self.hw_view.setLayoutMode(QListView.Batched)
+        self.hw_view.setSpacing(HomeworkDelegate.SPACING // 2)
+        self.hw_view.setMouseTracking(True)  # State_MouseOver для подсветки кнопки
+        self.hw_view.setSelectionMode(QListView.NoSelection)
+        self.hw_view.setEditTriggers(QListView.NoEditTriggers)
+        self.hw_view.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+        self.hw_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.hw_view.setStyleSheet("QListView { border: none; background: white; }")
+        self.hw_view.setModel(self.hw_model)
+        self.hw_view.setItemDelegate(self.hw_delegate)
+        hw_layout.addWidget(self.hw_view)
+
+        self.hw_delegate.clicked.connect(self._open_hw_dialog)
+        # Enter / двойной клик по карточке — то же, что кнопка
+        self.hw_view.activated.connect(
+            lambda idx: self._open_hw_dialog(idx.data(HomeworkModel.IdRole), idx.data(Qt.DisplayRole) or "")
+        )
+
+    def _build_diagnostics_page(self, page):
+        diag_layout = QVBoxLayout(page)
+        diag_label = QLabel("Диагностика")
+        diag_label.setFont(QFont("Segoe UI", 12, QFont.Bold))
+        diag_layout.addWidget(diag_label)
+
+        self.diag_text = QTextEdit()
+        self.diag_text.setReadOnly(True)
+        self.diag_text.setLineWrapMode(QTextEdit.NoWrap)
+        self.diag_text.setFont(QFont("Consolas", 9))
+        diag_layout.addWidget(self.diag_text)
+
+        diag_buttons = QHBoxLayout()
+        self.btn_diag_json = QPushButton("Копировать JSON")
+        self.btn_diag_prom = QPushButton("Копировать Prometheus")
+        self.btn_diag_reset = QPushButton("Сбросить счётчики")
+        for btn in (self.btn_diag_json, self.btn_diag_prom, self.btn_diag_reset):
+            diag_buttons.addWidget(btn)
+        diag_buttons.addStretch()
+        diag_layout.addLayout(diag_buttons)
+
+        self.btn_diag_json.clicked.connect(lambda: self._copy_metrics("to_json"))
+        self.btn_diag_prom.clicked.connect(lambda: self._copy_metrics("to_prometheus"))
+        self.btn_diag_reset.clicked.connect(self._reset_diagnostics)
 
     # ---- data loading ----
     def load_all_data(self):
+        # ручное обновление перекрывает плановые — они продолжатся, когда оно закончится
+        self.auto_refresh.pause()
         self.btn_refresh.setEnabled(False)
         self.btn_refresh.setText("Обновление...")
-        self.sdk.clear_cache()
-        monday = get_monday_of_week(datetime.now())
-        worker = Worker(self._fetch_data, monday)
-        worker.signals.finished.connect(self._update_ui)
+        # stale-while-revalidate: сразу показываем последнее известное, свежее подменит по мере прихода
+        if self._data_time is None:
+            snapshot = self._load_snapshot()
+            if snapshot:
+                data, age, _ = snapshot
+                self._update_ui(data)
+                self._last_data = dict(data)
+                self._data_time = time.time() - age
+        if self._data_time is not None:
+            self._set_stale(time.time() - self._data_time)
+
+        # месяцы расписания перезапросим у SDK (его кеш решит, нужно ли идти в сеть)
+        self._ensure_months(reload=True)
+        # из сети заново — только быстро меняющиеся эндпоинты, остальное живёт по TTL кеша
+        worker = Worker(self._fetch_data, revalidate=self.REFRESH_INVALIDATE)
+        worker.kwargs["on_section"] = worker.signals.section.emit
+        worker.signals.section.connect(self._render_section)
+        worker.signals.finished.connect(self._on_data_loaded)
         worker.signals.finished.connect(self._enable_refresh_btn)
         worker.signals.error.connect(self._on_error)
+        worker.signals.error.connect(self._enable_refresh_btn)
         self.pool.start(worker)
 
     def _enable_refresh_btn(self, *args):
         self.btn_refresh.setEnabled(True)
         self.btn_refresh.setText("Обновить")
+        self.auto_refresh.resume()
+
+    def _fetch_data(self, on_section=None, revalidate=()):
+        # все эндпоинты независимы — запускаем параллельно через FetchPlanner;
+        # ensure_token в SDK под замком, так что параллельные запросы дождутся одного логина.
+        # on_section(имя, данные) получает каждую секцию дашборда сразу по готовности.
+        # Каждая секция — в sdk.strict(): не полученная в результат не попадает (вместо "0%" или []),
+        # секции с EP_* из revalidate берутся из сети мимо кеша (кеш заменит только удачный ответ)
+        from core import UpstreamError
+
+        sdk = self.sdk
+        failed = object()
+
+        def task(method, endpoint):
+            def run():
+                try:
+                    with sdk.strict(), (sdk.revalidate() if endpoint in revalidate else nullcontext()):
+                        return getattr(sdk, method)()
+                except UpstreamError as e:
+                    logger.warning("Обновление: %s", e)
+                    return failed
+            return run
+
+        tasks = {name: task(method, endpoint) for name, (method, endpoint) in self.SECTION_SOURCES.items()}
+        def on_result(name, value):
+            if on_section is not None and name in self.SECTIONS and value is not failed:
+                on_section(name, value)
+
+        results = self.fetch_planner.run(tasks, on_result)
+        return {name: value for name, value in results.items() if value is not failed}
+
+    # ---- scheduled refresh ----
+    def _auto_refresh_section(self, name, done):
+        """
+        Плановое обновление одной секции (вызывает RefreshScheduler); done(ok) — по окончании.
+        Запрос идёт в sdk.strict() и sdk.revalidate(): при сбое на экране, в снимке и в кеше
+        на диске остаётся прежнее значение, done(False).
+        """
+        if name == "schedule":
+            # видимый месяц и соседние — заново из сети, дальние загрузятся при переходе
+            self._ensure_months(reload=True, done=done, revalidate=True)
+            return
+        method, _ = self.SECTION_SOURCES[name]
+        worker = Worker(self._fetch_strict, getattr(self.sdk, method), revalidate=True)
+        worker.signals.finished.connect(lambda value: (self._on_section_refreshed(name, value), done(True)))
+        worker.signals.error.connect(lambda message: (self._on_error(message), done(False)))
+        self.pool.start(worker)
 
-    def _fetch_data(self, monday: str):
-        # собираем расписание на 8 недель вперёд (можно поменять число)
-        all_schedule = []
-        start = datetime.strptime(monday, "%Y-%m-%d")
-
-        for i in range(8):  # 8 недель
-            week_start = start + timedelta(weeks=i)
-            week_str = week_start.strftime("%Y-%m-%d")
-            week_schedule = self.sdk.get_schedule(week_str)
-            if week_schedule:
-                all_schedule.extend(week_schedule)
-
-        return {
-            "homework": self.sdk.get_homework(),
-            "homeworks_list": self.sdk.get_homeworks_list(),
-            "avg": self.sdk.get_average_score(),
-            "leaders": self.sdk.get_leaderboard(),
-            "attendance": self.sdk.get_attendance(),
-            "schedule": all_schedule,  
-        }
-
-
+    def _fetch_strict(self, fn, *args, revalidate=False):
+        """
+        fn(*args) в sdk.strict(): неудавшийся запрос — исключение (сигнал error), а не "0%" или [].
+        :param revalidate: мимо кеша, в sdk.revalidate() — кеш заменит только удачный ответ
+        """
+        with self.sdk.strict(), (self.sdk.revalidate() if revalidate else nullcontext()):
+            return fn(*args)
+
+    def _on_section_refreshed(self, name, value):
+        self._render_section(name, value)
+        if self._last_data is not None:
+            self._last_data[name] = value
+            self._save_snapshot(self._last_data)
+
+    # ---- schedule months ----
+    @staticmethod
+    def _add_months(month, offset):
+        """(год, месяц) + offset месяцев."""
+        index = month[0] * 12 + month[1] - 1 + offset
+        return index // 12, index % 12 + 1
+
+    def _visible_month(self):
+        return self.calendar.yearShown(), self.calendar.monthShown()
+
+    def _ensure_months(self, reload=False, done=None, revalidate=False):
+        """
+        Догружает расписание вокруг показанного месяца: сам месяц — в первую очередь,
+        предыдущий и следующий — заранее в фоне, чтобы листание было мгновенным.
+        :param reload: перезапросить и уже загруженные (до ответа на экране остаются прежние данные),
+                       а дальние месяцы забыть — их загрузят заново при переходе
+        :param done: done(ok) — когда загрузится видимый месяц (для RefreshScheduler)
+        :param revalidate: перезапрашиваемые месяцы — из сети мимо кеша SDK (см. _load_month)
+        """
+        if self.sdk is None or self.PAGE_SCHEDULE not in self._built_pages:
+            if done is not None:
+                done(True)  # страница не построена — обновлять нечего
+            return
+        visible = self._visible_month()
+        nearby = [self._add_months(visible, offset) for offset in (0, -1, 1)]
+        if reload:
+            for month in [m for m in self._months if m not in nearby]:
+                del self._months[month]
+        for month, priority in zip(nearby, (1, 0, 0)):
+            if month in self._months and not reload:
+                self._months.move_to_end(month)
+            elif month not in self._months_loading:
+                self._load_month(month, priority, done if month == visible else None, revalidate)
+                if month == visible:
+                    done = None
+        if done is not None:
+            done(True)  # видимый месяц уже грузится — ответ и так будет свежим
+
+    def _load_month(self, month, priority=0, done=None, revalidate=False):
+        """
+        Месяц в фоне в sdk.strict(): при сбое уже загруженные уроки месяца остаются прежними.
+        :param revalidate: недели месяца — из сети мимо кеша; кеш заменят только удачные ответы
+        """
+        self._months_loading.add(month)
+        worker = Worker(self._fetch_strict, self.sdk.get_month_lessons, *month, revalidate=revalidate)
+        worker.signals.finished.connect(lambda lessons, month=month: self._on_month_loaded(month, lessons))
+        worker.signals.error.connect(lambda message, month=month: self._on_month_error(month, message))
+        if done is not None:
+            worker.signals.finished.connect(lambda lessons: done(True))
+            worker.signals.error.connect(lambda message: done(False))
+        self.pool.start(worker, priority)
+
+    def _on_month_loaded(self, month, lessons):
+        from core import LessonSchedule  # SDK уже загружен — месяц пришёл от него
+
+        self._months_loading.discard(month)
+        self._months[month] = lessons
+        self._months.move_to_end(month)
+        # вытесняем давно не показанные месяцы, но не видимый и не его соседей
+        visible = self._visible_month()
+        keep = {self._add_months(visible, offset) for offset in (-1, 0, 1)}
+        while len(self._months) > self.MONTH_CACHE_SIZE:
+            victim = next((m for m in self._months if m not in keep), None)
+            if victim is None:
+                break
+            del self._months[victim]
+        # месяцы не пересекаются — склеиваем; подсветка и список дня обновятся по разнице
+        self._render_section("schedule", LessonSchedule.merge(self._months.values()))
+        selected = self.calendar.selectedDate()
+        if month == (selected.year(), selected.month()):
+            self.show_day_lessons()  # вместо «Загрузка...»
+
+    def _on_month_error(self, month, message):
+        self._months_loading.discard(month)
+        self._on_error(message)
+        selected = self.calendar.selectedDate()
+        if month == (selected.year(), selected.month()):
+            self.show_day_lessons()
 
     # ---- UI update ----
+    def _on_data_loaded(self, data):
+        """data — только полученные секции; остальные остаются прежними на экране и в снимке."""
+        self._update_ui(data)
+        failed = [name for name in self.SECTION_SOURCES if name not in data]
+        self._last_data = {**(self._last_data or {}), **data}
+        # расписание тоже перезапрошено в load_all_data
+        self.auto_refresh.mark_fresh([name for name in self.AUTO_REFRESH if name not in failed])
+        if not failed:
+            self._data_time = time.time()
+            self._set_stale(None)
+        elif self._data_time is not None:
+            self._set_stale(time.time() - self._data_time, failed)
+        if data:
+            self._save_snapshot(self._last_data)
+        if self.startup.mark("data_loaded"):
+            self.startup.log_report()
+
     def _update_ui(self, data):
-        # cards
-        hw = data.get("homework", [0, 0])
+        for name in self.SECTIONS:
+            if name in data:
+                self._render_section(name, data[name])
+
+    def _render_section(self, name, value):
+        self.startup.mark("first_data")
+        # те же данные, что уже показаны (или ждут своей страницы), — секцию не трогаем
+        digest = section_digest(value)
+        if self._section_digests.get(name) == digest:
+            return
+        self._section_digests[name] = digest
+        if name == "homeworks_list":
+            # сроки сдачи нужны календарю, даже если страница ДЗ ещё не построена
+            self._update_deadlines(value)
+        page = self.SECTION_PAGES.get(name)
+        if page is not None and page not in self._built_pages:
+            self._pending_sections[name] = value
+            return
+        getattr(self, f"_render_{name}")(value)
+
+    def _set_stale(self, age, failed=None):
+        """
+        age — возраст показанных данных в секундах; None — данные свежие.
+        failed — секции, которые обновить не удалось: устаревшими помечаются только их карточки.
+        """
+        cards = {
+            "homework": (self.card_tasks, self.card_overdue),
+            "avg": (self.card_avg,),
+            "attendance": (self.card_attendance,),
+        }
+        for name, section_cards in cards.items():
+            for card in section_cards:
+                card.set_stale(age is not None and (failed is None or name in failed))
+        if age is None:
+            self.stale_label.hide()
+        else:
+            status = "обновить не удалось" if failed else "обновление..."
+            self.stale_label.setText(f"Показаны сохранённые данные ({format_age(age)}) — {status}")
+            self.stale_label.show()
+
+    # ---- snapshot (последние данные дашборда в постоянном кеше) ----
+    def _snapshot_key(self):
+        return f"{self.sdk.username}|snapshot:dashboard"
+
+    def _load_snapshot(self):
+        if self.sdk.disk_cache is None:
+            return None
+        return self.sdk.disk_cache.get_with_age(self._snapshot_key(), allow_stale=True)
+
+    def _save_snapshot(self, data):
+        if self.sdk.disk_cache is not None:
+            data = {name: to_jsonable(value) for name, value in data.items()}
+            self.sdk.disk_cache.set(self._snapshot_key(), data, self.SNAPSHOT_TTL)
+
+    # ---- sections ----
+    def _render_homework(self, hw):
+        hw = hw or [0, 0]
         self.card_tasks.set_value(hw[0])
         self.card_overdue.set_value(hw[1])
-        self.card_avg.set_value(data.get("avg", "—"))
-        self.card_attendance.set_value(data.get("attendance", "—"))
-
-        # leaders
-        self.leader_list.clear()
-        self.leader_list.addItems(data.get("leaders", ["Нет данных"]))
-
-        # parse schedule -> fill self._schedule_by_date (date_str -> list[str])
-        raw_schedule = data.get("schedule", []) or []
-        mapped = {}
-        for item in raw_schedule:
-            # item может быть строкой "YYYY-MM-DD — subject" или dict с полем date/subject
-            if isinstance(item, dict):
-                date = item.get("date")
-                # пытаемся получить человека/предмет
-                subject = item.get("subject") or item.get("lesson") or item.get("theme") or ""
-                line = f"{date} — {subject}" if subject else date
-            elif isinstance(item, str):
-                # ожидаем формат "YYYY-MM-DD ...", разбираем первое поле как дату
-                parts = item.split("—", 1)
-                if len(parts) == 2:
-                    date = parts[0].strip()
-                    subject = parts[1].strip()
-                    line = f"{subject}"
-                else:
-                    tokens = item.split()
-                    date = tokens[0] if tokens else ""
-                    subject = " ".join(tokens[1:]) if len(tokens) > 1 else ""
-                    line = subject or item
-            else:
-                continue
 
-            if not date:
-                continue
-            mapped.setdefault(date, []).append(line)
+    def _render_avg(self, avg):
+        self.card_avg.set_value(avg)
+
+    def _render_attendance(self, attendance):
+        self.card_attendance.set_value(attendance)
+
+    def _render_leaders(self, leaders):
+        new = list(leaders) if leaders is not None else ["Нет данных"]
+        old = [self.leader_list.item(i).text() for i in range(self.leader_list.count())]
+        for tag, i1, i2, j1, j2 in list_changes(old, new):
+            common = min(i2 - i1, j2 - j1)
+            for k in range(common):
+                self.leader_list.item(i1 + k).setText(new[j1 + k])
+            for row in range(i2 - 1, i1 + common - 1, -1):
+                self.leader_list.takeItem(row)
+            if j2 - j1 > common:
+                self.leader_list.insertItems(i1 + common, new[j1 + common:j2])
+
+    def _render_schedule(self, schedule):
+        # LessonSchedule из загруженных месяцев или список Lesson.to_json()
+        from core import LessonSchedule  # core уже загружен: данные пришли от SDK или из его кеша
+
+        if not isinstance(schedule, LessonSchedule):
+            schedule = LessonSchedule.from_response(schedule)
 
         # сохраняем в атрибут для использования при клике
-        self._schedule_by_date = mapped
+        old = self._schedule_by_date
+        self._schedule_by_date = schedule
 
-        # подсветка дат
-        self.highlight_schedule_dates()
+        # подсветка: только появившиеся даты, исчезнувшие — сбросить
+        old_dates = old.dates() if old is not None else []
+        added = [d for d in schedule.dates() if old is None or d not in old]
+        removed = [d for d in old_dates if d not in schedule]
+        self.calendar_marks.update("lessons", added, removed)
 
-        # обновляем метку месяца (если пользователь на странице)
-        self.update_month_label()
+        # список уроков перерисовываем, только если поменялся выбранный день
+        selected = self.calendar.selectedDate().toPyDate()
+        if old is None or old.on_date(selected) != schedule.on_date(selected):
+            self.show_day_lessons()
 
-        # домашки (карточки)
-        while self.hw_container.count():
-            item = self.hw_container.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-
-        homeworks = data.get("homeworks_list", [])
-
-        cols = 4
-        row = 0
-        col = 0
-        for hw in homeworks:
-            title = hw.get("title") if isinstance(hw, dict) else str(hw)
-            hw_id = hw.get("id") if isinstance(hw, dict) else None
-            card = HomeworkCard(hw_id, title, self._open_hw_dialog)
-            self.hw_container.addWidget(card, row, col)
-            col += 1
-            if col >= cols:
-                col = 0
-                row += 1
-
-        # сразу показать уроки для текущей выбранной даты
-        self.show_day_lessons()
+    def _render_homeworks_list(self, homeworks):
+        # домашки (карточки) — модель обновляется на месте, виджеты не пересоздаются
+        self.hw_model.set_items(homeworks)
 
     # ---- calendar helper ----
-    def highlight_schedule_dates(self):
-        """Подсветить все даты, для которых есть записи в self._schedule_by_date."""
-        # очищаем предыдущие форматы (заниженно — чищу всё календаря)
-        default_fmt = QTextCharFormat()
-        # получить диапазон текущего отображаемого месяца и очистить только его — но проще очистить всё:
-        # NOTE: setDateTextFormat(QDate(), fmt) не очищает — применяем для каждой существующей даты замену.
-        # Для простоты — перезапишем только даты из self._schedule_by_date
-        # (Если нужно, можно хранить старые форматы и восстанавливать)
-        highlight = QTextCharFormat()
-        highlight.setBackground(QColor("#e6f0ff"))
-        highlight.setForeground(QColor("#000000"))
-        highlight.setFontWeight(QFont.Bold)
-
-        # Сначала очистим формат для всех известных дат (чтобы избежать наслоений)
-        # (проходим календарь: 1..31 текущего года/месяца — но это тяжеловато, пропустим)
-        # Просто установим формат для нужных дат
-        for date_str in self._schedule_by_date.keys():
-            try:
-                d = datetime.strptime(date_str, "%Y-%m-%d").date()
-                qd = QDate(d.year, d.month, d.day)
-                self.calendar.setDateTextFormat(qd, highlight)
-            except Exception as e:
-                # если парсинг не удался — пропустить
-                # print("highlight parse error:", e)
-                continue
+    def _update_deadlines(self, homeworks):
+        dates = set()
+        for hw in homeworks or []:
+            if isinstance(hw, dict) and hw.get("deadline"):
+                try:
+                    dates.add(date.fromisoformat(hw["deadline"]))
+                except (TypeError, ValueError):
+                    pass
+        self._deadline_dates = dates
+        if self.PAGE_SCHEDULE in self._built_pages:
+            self.calendar_marks.set_dates("deadlines", dates)
 
     def show_day_lessons(self):
         """Показать уроки за выбранный день (день, не неделя)."""
         self.schedule_list.clear()
-        sel = self.calendar.selectedDate()
-        date_str = sel.toString("yyyy-MM-dd")
-        lessons = self._schedule_by_date.get(date_str, [])
+        day = self.calendar.selectedDate().toPyDate()
+        lessons = self._schedule_by_date.on_date(day) if self._schedule_by_date is not None else []
         if lessons:
-            # уроки уже содержат описания (subject lines), добавляем красиво
-            self.schedule_list.addItems(lessons)
+            # строки собираются только для выбранного дня
+            self.schedule_list.addItems([format_lesson(lesson) for lesson in lessons])
+        elif (day.year, day.month) in self._months_loading and (day.year, day.month) not in self._months:
+            self.schedule_list.addItem("Загрузка...")
         else:
             self.schedule_list.addItem("Нет уроков")
+        if day in self._deadline_dates:
+            self.schedule_list.addItem("Срок сдачи домашнего задания")
 
     def shift_month(self, offset: int):
         """Сдвинуть отображаемый месяц в календаре (offset в месяцах)."""
         cur = self.calendar.selectedDate()
         new = cur.addMonths(offset)
         self.calendar.setSelectedDate(new)
-        # прокрутка view: QCalendarWidget автоматически покажет нужный месяц при установке selectedDate
+        # прокрутка view: QCalendarWidget автоматически покажет нужный месяц при установке selectedDate,
+        # а currentPageChanged догрузит его расписание (_ensure_months)
         self.update_month_label()
-        # при смене месяца можно заново подсветить даты (подсветка основана на полных датах, потому ничего не нужно делать)
 
     def update_month_label(self):
         sel = self.calendar.selectedDate()
@@ -529,6 +1296,54 @@ class MyStatApp(QMainWindow):
             txt = txt[0].upper() + txt[1:]
         self.month_label.setText(txt)
 
+    # ---- diagnostics ----
+    def show_diagnostics(self):
+        self.pages.setCurrentWidget(self.page_diag)
+
+    def _on_page_changed(self, index):
+        self._ensure_page(index)
+        # таймер крутится только пока страница диагностики на экране
+        if self.pages.widget(index) is self.page_diag:
+            self.update_diagnostics()
+            self.diag_timer.start()
+        else:
+            self.diag_timer.stop()
+
+    def update_diagnostics(self):
+        sdk = self.sdk
+        # до готовности SDK (или если его не удалось создать) метрик нет — кнопки неактивны
+        for btn in (self.btn_diag_json, self.btn_diag_prom, self.btn_diag_reset):
+            btn.setEnabled(sdk is not None)
+        if sdk is None:
+            self.diag_text.setPlainText("SDK ещё загружается...\n\n" + self.startup.report())
+            return
+        mem = sdk.memory_cache.stats()
+        parts = [
+            sdk.metrics.report(),
+            "",
+            f"кеш в памяти: {mem['entries']} записей, {mem['bytes'] / 1024:.1f} КБ, "
+            f"попаданий {mem['hits']}, промахов {mem['misses']}, вытеснено {mem['evictions']}",
+            f"схлопнуто одинаковых GET: {sdk.coalesce_stats['coalesced']} "
+            f"(ушло в сеть {sdk.coalesce_stats['requests']})",
+            f"ответов 429: {sdk.rate_limiter.throttled}",
+        ]
+        if self.fetch_planner.timings:
+            parts += ["", "последнее обновление:", self.fetch_planner.report()]
+        parts += ["", self.auto_refresh.report(), "", self.startup.report()]
+        self.diag_text.setPlainText("\n".join(parts))
+
+    def _copy_metrics(self, export):
+        """export — имя метода Metrics: to_json или to_prometheus."""
+        if self.sdk is None:
+            return
+        QApplication.clipboard().setText(getattr(self.sdk.metrics, export)())
+
+    def _reset_diagnostics(self):
+        if self.sdk is None:
+            return
+        self.sdk.metrics.reset()
+        self.update_diagnostics()
+
     def _open_hw_dialog(self, hw_id, hw_title):
         dialog = HomeworkDialog(hw_id, hw_title, self.sdk, self)
         dialog.exec_()
@@ -537,9 +1352,24 @@ class MyStatApp(QMainWindow):
         print("Ошибка:", message)
 
 
+def _make_sdk():
+    from cache import DiskCache
+    from core import MyStatSDK
+
+    sdk = MyStatSDK("foros_md93", "gHrh7w*6", disk_cache=DiskCache())  # аккуратно с логином/паролем
+    if os.environ.get("MYSTAT_METRICS_PORT"):
+        from metrics import serve_metrics
+
+        # внешний сбор метрик: http://127.0.0.1:<порт>/metrics
+        serve_metrics(sdk.metrics, int(os.environ["MYSTAT_METRICS_PORT"]))
+    return sdk
+
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    startup = StartupTimer()
+    startup.mark("imports")
     app = QApplication(sys.argv)
-    sdk = MyStatSDK("foros_md93", "gHrh7w*6")  # аккуратно с логином/паролем
-    window = MyStatApp(sdk)
+    window = MyStatApp(sdk_factory=_make_sdk, startup=startup)
     window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,304 @@
+""" Метрики запросов и кеша MyStatSDK.
+
+    Metrics     — потокобезопасные счётчики по эндпоинтам: гистограмма задержек,
+                  байты, коды ответов, повторы, ошибки сети, попадания/промахи
+                  кешей, схлопнутые запросы; отдельно — логины.
+                  Экспорт: snapshot() (dict), to_json(), to_prometheus().
+    Histogram   — гистограмма с фиксированными границами (как в Prometheus)
+                  и оценкой квантилей по корзинам.
+    serve_metrics() — фоновый HTTP-экспортёр: /metrics (Prometheus) и /metrics.json.
+    """
+import bisect
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, List, Tuple
+
+logger = logging.getLogger("MyStatSDK")
+
+
+class Histogram:
+    # границы корзин в секундах (+Inf добавляется неявно)
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: Optional[Tuple[float, ...]] = None):
+        self.bounds = tuple(bounds or self.BUCKETS)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля q (0..1) линейной интерполяцией внутри корзины."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lo = self.bounds[i - 1] if i > 0 else 0.0
+                hi = min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+                return lo + (hi - lo) * (rank - seen) / n
+            seen += n
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_s": round(self.sum, 6),
+            "avg_ms": round(self.sum / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 2),
+            "p95_ms": round(self.quantile(0.95) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+            "buckets": {str(b): c for b, c in zip(self.bounds + ("+Inf",), self.counts)},
+        }
+
+
+class _EndpointStats:
+    __slots__ = ("latency", "bytes_in", "bytes_out", "statuses", "retries", "errors",
+                 "cache_memory", "cache_disk", "cache_miss", "coalesced")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.statuses: Dict[int, int] = {}
+        self.retries = 0
+        self.errors = 0  # сетевые ошибки без HTTP-ответа
+        self.cache_memory = 0
+        self.cache_disk = 0
+        self.cache_miss = 0
+        self.coalesced = 0
+
+
+class Metrics:
+    """
+    Счётчики MyStatSDK по эндпоинтам. Один объект можно отдать нескольким SDK —
+    тогда метрики суммируются. Все методы record_* потокобезопасны и дешёвые
+    (один замок, без аллокаций на горячем пути, кроме первого обращения к эндпоинту).
+    """
+
+    CACHE_LAYERS = ("memory", "disk", "miss")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, _EndpointStats] = {}
+        self.logins = {"ok": 0, "failed": 0}
+        self.login_latency = Histogram()
+        self.started_at = time.time()
+
+    def _ep(self, endpoint: Optional[str]) -> _EndpointStats:
+        key = (endpoint or "other").split("?", 1)[0]
+        stats = self._endpoints.get(key)
+        if stats is None:
+            stats = self._endpoints[key] = _EndpointStats()
+        return stats
+
+    # ---------- запись ----------
+
+    def record_request(
+        self,
+        endpoint: Optional[str],
+        seconds: float,
+        status: Optional[int],
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+    ) -> None:
+        """Один HTTP-обмен (каждая попытка отдельно). status=None — сетевая ошибка."""
+        with self._lock:
+            ep = self._ep(endpoint)
+            ep.latency.observe(seconds)
+            ep.bytes_in += bytes_in
+            ep.bytes_out += bytes_out
+            if status is None:
+                ep.errors += 1
+            else:
+                ep.statuses[status] = ep.statuses.get(status, 0) + 1
+
+    def record_bytes(self, endpoint: Optional[str], bytes_in: int = 0, bytes_out: int = 0) -> None:
+        """Байты потоковой передачи, дочитанные после record_request (скачивание файлов)."""
+        with self._lock:
+            ep = self._ep(endpoint)
+            ep.bytes_in += bytes_in
+            ep.bytes_out += bytes_out
+
+    def record_retry(self, endpoint: Optional[str]) -> None:
+        with self._lock:
+            self._ep(endpoint).retries += 1
+
+    def record_cache(self, endpoint: Optional[str], layer: str) -> None:
+        """layer: 'memory' / 'disk' — попадание в этот кеш, 'miss' — пошли в сеть."""
+        with self._lock:
+            ep = self._ep(endpoint)
+            if layer == "memory":
+                ep.cache_memory += 1
+            elif layer == "disk":
+                ep.cache_disk += 1
+            else:
+                ep.cache_miss += 1
+
+    def record_coalesced(self, endpoint: Optional[str]) -> None:
+        with self._lock:
+            self._ep(endpoint).coalesced += 1
+
+    def record_login(self, ok: bool, seconds: float) -> None:
+        with self._lock:
+            self.logins["ok" if ok else "failed"] += 1
+            self.login_latency.observe(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+            self.logins = {"ok": 0, "failed": 0}
+            self.login_latency = Histogram()
+            self.started_at = time.time()
+
+    # ---------- экспорт ----------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Все метрики одним JSON-совместимым словарём."""
+        with self._lock:
+            endpoints = {}
+            for name, ep in sorted(self._endpoints.items()):
+                lookups = ep.cache_memory + ep.cache_disk + ep.cache_miss
+                endpoints[name] = {
+                    "latency": ep.latency.to_dict(),
+                    "bytes_in": ep.bytes_in,
+                    "bytes_out": ep.bytes_out,
+                    "statuses": {str(k): v for k, v in sorted(ep.statuses.items())},
+                    "retries": ep.retries,
+                    "errors": ep.errors,
+                    "cache": {
+                        "memory": ep.cache_memory,
+                        "disk": ep.cache_disk,
+                        "miss": ep.cache_miss,
+                        "hit_ratio": round((ep.cache_memory + ep.cache_disk) / lookups, 3) if lookups else None,
+                    },
+                    "coalesced": ep.coalesced,
+                }
+            return {
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "logins": dict(self.logins),
+                "login_latency": self.login_latency.to_dict(),
+                "endpoints": endpoints,
+            }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.snapshot(), indent=indent, ensure_ascii=False)
+
+    def to_prometheus(self, prefix: str = "mystat") -> str:
+        """Текстовый формат Prometheus (exposition format 0.0.4)."""
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        def histogram(name: str, hist: Histogram, labels: str) -> None:
+            sep = "," if labels else ""
+            cumulative = 0
+            for bound, n in zip(hist.bounds + ("+Inf",), hist.counts):
+                cumulative += n
+                lines.append(f'{prefix}_{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+            lines.append(f"{prefix}_{name}_sum{{{labels}}} {hist.sum:.6f}")
+            lines.append(f"{prefix}_{name}_count{{{labels}}} {hist.count}")
+
+        with self._lock:
+            items = sorted(self._endpoints.items())
+            header("request_duration_seconds", "histogram", "Время HTTP-запроса (каждая попытка)")
+            for name, ep in items:
+                histogram("request_duration_seconds", ep.latency, f'endpoint="{name}"')
+            header("responses_total", "counter", "Ответы по кодам HTTP")
+            for name, ep in items:
+                for code, n in sorted(ep.statuses.items()):
+                    lines.append(f'{prefix}_responses_total{{endpoint="{name}",code="{code}"}} {n}')
+            header("bytes_total", "counter", "Переданные байты (тела запросов и ответов)")
+            for name, ep in items:
+                lines.append(f'{prefix}_bytes_total{{endpoint="{name}",direction="in"}} {ep.bytes_in}')
+                lines.append(f'{prefix}_bytes_total{{endpoint="{name}",direction="out"}} {ep.bytes_out}')
+            header("retries_total", "counter", "Повторы запросов по RetryPolicy")
+            for name, ep in items:
+                lines.append(f'{prefix}_retries_total{{endpoint="{name}"}} {ep.retries}')
+            header("network_errors_total", "counter", "Сетевые ошибки без HTTP-ответа")
+            for name, ep in items:
+                lines.append(f'{prefix}_network_errors_total{{endpoint="{name}"}} {ep.errors}')
+            header("cache_lookups_total", "counter", "Обращения к кешу _get по результату")
+            for name, ep in items:
+                for layer, n in zip(self.CACHE_LAYERS, (ep.cache_memory, ep.cache_disk, ep.cache_miss)):
+                    lines.append(f'{prefix}_cache_lookups_total{{endpoint="{name}",result="{layer}"}} {n}')
+            header("coalesced_total", "counter", "Запросы, дождавшиеся чужого одинакового GET")
+            for name, ep in items:
+                lines.append(f'{prefix}_coalesced_total{{endpoint="{name}"}} {ep.coalesced}')
+            header("logins_total", "counter", "Логины по результату")
+            for result, n in self.logins.items():
+                lines.append(f'{prefix}_logins_total{{result="{result}"}} {n}')
+            header("login_duration_seconds", "histogram", "Время логина")
+            histogram("login_duration_seconds", self.login_latency, "")
+        return "\n".join(lines) + "\n"
+
+    def report(self) -> str:
+        """Короткая таблица по эндпоинтам для людей (страница диагностики, логи)."""
+        snap = self.snapshot()
+        lines = [
+            f"{'эндпоинт':<34} {'запр.':>6} {'p50 мс':>8} {'p95 мс':>8} {'КБ':>9} {'повт.':>6} {'ошиб.':>6} {'кеш %':>6}",
+        ]
+        for name, ep in snap["endpoints"].items():
+            lat = ep["latency"]
+            ratio = ep["cache"]["hit_ratio"]
+            bad = ep["errors"] + sum(n for code, n in ep["statuses"].items() if not code.startswith("2"))
+            lines.append(
+                f"{name:<34} {lat['count']:>6} {lat['p50_ms']:>8.1f} {lat['p95_ms']:>8.1f} "
+                f"{(ep['bytes_in'] + ep['bytes_out']) / 1024:>9.1f} {ep['retries']:>6} {bad:>6} "
+                f"{'—' if ratio is None else f'{ratio * 100:.0f}':>6}"
+            )
+        logins = snap["logins"]
+        lines.append(
+            f"логины: {logins['ok']} успешных, {logins['failed']} неудачных, "
+            f"p50 {snap['login_latency']['p50_ms']:.1f} мс"
+        )
+        return "\n".join(lines)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        metrics: Metrics = self.server.metrics
+        if path == "/metrics":
+            body, ctype = metrics.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body, ctype = metrics.to_json().encode("utf-8"), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_metrics(metrics: Metrics, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Поднимает экспортёр метрик в фоновом потоке: GET /metrics (Prometheus) и /metrics.json.
+    Остановить — server.shutdown().
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, name="mystat-metrics", daemon=True).start()
+    logger.info("Метрики: http://%s:%d/metrics", host, server.server_address[1])
+    return server
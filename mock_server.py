@@ -0,0 +1,478 @@
+""" Локальный стенд MyStat API — без mapi.itstep.org и без настоящих логинов.
+
+    MockMyStatServer эмулирует все эндпоинты, которые дёргает core.py:
+    логин, оценки, прогресс, лидеров, счётчики и список ДЗ (постранично, с _meta),
+    посещаемость, расписание недели, homework/create, file-token, а также
+    файловый сервер: HEAD (проба зеркала), POST /api/v1/files (загрузка)
+    и GET /files/... (скачивание вложений с поддержкой Range).
+
+    Настраивается задержка ответа, доля ошибок (503 на GET), размеры данных
+    (число ДЗ, уроков в день, лидеров, оценок, размер файла вложения).
+    По умолчанию HTTP; tls=True — HTTPS с самоподписанным сертификатом (openssl)
+    и подсчётом TLS-рукопожатий.
+
+    Запуск отдельно: python mock_server.py [--port 8080] [--latency 0.05] [--homeworks 500]
+    """
+import argparse
+import json
+import os
+import random
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlsplit, parse_qs
+
+from core import MyStatSDK, HostHealth
+from ratelimit import RateLimiter
+
+os.environ.setdefault("NO_PROXY", "127.0.0.1,localhost")
+
+API_PREFIX = "/v1/mystat"
+SUBJECTS = ["Python", "Базы данных", "Веб-дизайн", "Алгоритмы", "Английский", "Сети", "C++", "Математика"]
+
+
+def _ep_path(endpoint: str) -> str:
+    return endpoint.split("?", 1)[0]
+
+
+def make_cert(folder: str):
+    """Самоподписанный сертификат на 127.0.0.1. Возвращает (cert.pem, key.pem)."""
+    cert, key = os.path.join(folder, "cert.pem"), os.path.join(folder, "key.pem")
+    subprocess.run(
+        [
+            shutil.which("openssl") or "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=127.0.0.1",
+            "-addext", "subjectAltName=IP:127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, как у настоящего API
+    disable_nagle_algorithm = True  # без этого keep-alive упирается в задержку delayed ACK
+
+    # ---------- ответы ----------
+
+    def _send_json(self, code: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+        self.server.count(self.path, code, len(raw))
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _drain_body(self) -> int:
+        """Читает тело кусками, не держа его в памяти. Возвращает число байт."""
+        left = int(self.headers.get("Content-Length", 0) or 0)
+        total = left
+        while left > 0:
+            chunk = self.rfile.read(min(left, 64 * 1024))
+            if not chunk:
+                break
+            left -= len(chunk)
+        return total - left
+
+    def _authorized(self) -> bool:
+        auth = self.headers.get("Authorization", "")
+        return auth.startswith("Bearer ") and auth[7:] in self.server.tokens
+
+    # ---------- методы ----------
+
+    def do_HEAD(self):
+        # проба зеркала FS: любой ответ = живое
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        self.server.count(self.path, 200, 0)
+
+    def do_GET(self):
+        srv = self.server
+        srv.delay()
+        parts = urlsplit(self.path)
+        if parts.path.startswith("/files/"):
+            return self._send_file()
+        if not parts.path.startswith(API_PREFIX):
+            return self._send_json(404, {"error": "not found"})
+        if not self._authorized():
+            return self._send_json(401, {"message": "Unauthorized"})
+        if srv.should_fail():
+            return self._send_json(srv.error_status, {"message": "mock error"}, {"Retry-After": "0"})
+
+        path = parts.path[len(API_PREFIX):]
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        body = srv.route(path, query)
+        if body is None:
+            return self._send_json(404, {"error": "not found"})
+        self._send_json(200, body)
+
+    def do_POST(self):
+        srv = self.server
+        srv.delay()
+        path = urlsplit(self.path).path
+        if path == "/api/v1/files":
+            received = self._drain_body()
+            with srv.lock:
+                srv.bytes_received += received
+                srv.uploads += 1
+                n = srv.uploads
+            return self._send_json(200, [{"link": f"{srv.url}/files/uploads/{n}.bin"}])
+
+        raw = self._read_body()
+        if path == API_PREFIX + MyStatSDK.EP_LOGIN:
+            try:
+                creds = json.loads(raw or b"{}")
+            except ValueError:
+                creds = {}
+            if not creds.get("login") or creds.get("password") == srv.bad_password:
+                return self._send_json(401, {"message": "Неверный логин или пароль"})
+            return self._send_json(200, srv.issue_token(creds["login"]))
+        if path == API_PREFIX + MyStatSDK.EP_HW_CREATE:
+            if not self._authorized():
+                return self._send_json(401, {"message": "Unauthorized"})
+            return self._send_json(200, {"status": "ok"})
+        self._send_json(404, {"error": "not found"})
+
+    def _send_file(self):
+        """Вложение ДЗ: детерминированные байты размера file_size, Range 'bytes=N-' с If-Range по ETag."""
+        srv = self.server
+        name = urlsplit(self.path).path.rsplit("/", 1)[-1]
+        size = srv.file_size
+        etag = f'"{srv.seed}-{size}"'
+        start = 0
+        rng = self.headers.get("Range", "")
+        if_range = self.headers.get("If-Range")
+        if rng.startswith("bytes=") and (if_range is None or if_range == etag):
+            try:
+                start = int(rng[6:].split("-", 1)[0])
+            except ValueError:
+                start = 0
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                srv.count(self.path, 416, 0)
+                return
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Disposition", f'attachment; filename="{name}"')
+        self.send_header("Content-Length", str(size - start))
+        self.send_header("ETag", etag)
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        self.end_headers()
+        block = srv.file_block
+        pos = start
+        while pos < size:
+            off = pos % len(block)
+            piece = block[off:off + min(len(block) - off, size - pos)]
+            self.wfile.write(piece)
+            pos += len(piece)
+        srv.count(self.path, 206 if start else 200, size - start)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockMyStatServer(ThreadingHTTPServer):
+    """
+    Стенд MyStat API в фоновом потоке. Используется как контекстный менеджер:
+
+        with MockMyStatServer(latency=0.02, homeworks=1000) as srv:
+            sdk = srv.make_sdk()
+            sdk.get_homework()
+
+    Счётчики: requests (по путям), statuses, bytes_sent, bytes_received, logins, handshakes.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128  # параллельная выборка открывает соединения пачкой
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        homeworks: int = 100,
+        lessons_per_day: int = 3,
+        leaders: int = 10,
+        marks: int = 50,
+        file_size: int = 256 * 1024,
+        tls: bool = False,
+        seed: int = 1,
+    ):
+        """
+        :param port: порт (0 — любой свободный)
+        :param latency: задержка перед каждым ответом API и FS, сек
+        :param error_rate: доля GET к API, на которые отвечаем error_status (0..1)
+        :param error_status: код ошибки (503 — повторяемая, 500/502/504/429 — тоже)
+        :param homeworks: сколько ДЗ в истории (homework/list отдаёт их постранично)
+        :param lessons_per_day: уроков в каждый будний день расписания
+        :param leaders: записей в таблице лидеров
+        :param marks: оценок в statistic/marks
+        :param file_size: размер каждого вложения ДЗ, байт
+        :param tls: HTTPS с самоподписанным сертификатом (см. cert_path)
+        :param seed: зерно генератора данных и ошибок
+        """
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.lessons_per_day = lessons_per_day
+        self.file_size = file_size
+        self.file_block = bytes(range(256)) * 256  # 64 КБ, из них нарезаются вложения
+        self.bad_password = "wrong"  # с этим паролем логин не проходит
+        self.lock = threading.Lock()
+        self.seed = seed  # входит в ETag вложений: сменить — «файл на сервере изменился»
+        self._rng = random.Random(seed)
+        self.tokens: Dict[str, str] = {}  # токен -> логин
+        self.reset_stats()
+
+        self.tls = tls
+        self._tmp = None
+        self.cert_path = None
+        self.ctx = None
+        if tls:
+            self._tmp = tempfile.mkdtemp(prefix="mystat-mock-")
+            self.cert_path, key = make_cert(self._tmp)
+            self.ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self.ctx.load_cert_chain(self.cert_path, key)
+
+        scheme = "https" if tls else "http"
+        self.url = f"{scheme}://127.0.0.1:{self.server_address[1]}"
+        self.api_url = self.url + API_PREFIX
+        self._build_data(homeworks, leaders, marks)
+        self._thread = None
+
+    # ---------- жизненный цикл ----------
+
+    def start(self) -> "MockMyStatServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mystat-mock", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+        if self._tmp:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+            self._tmp = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def get_request(self):
+        sock, addr = super().get_request()
+        with self.lock:
+            self.handshakes += 1  # для HTTP — просто число новых TCP-соединений
+        if self.ctx is not None:
+            sock = self.ctx.wrap_socket(sock, server_side=True)
+        return sock, addr
+
+    # ---------- клиент ----------
+
+    def make_sdk(self, username: str = "student", password: str = "secret", **kwargs) -> MyStatSDK:
+        """
+        MyStatSDK, направленный на стенд: base_url, доверие к сертификату, зеркало FS —
+        сам стенд. Лимиты частоты по умолчанию сняты (мерим транспорт и код, не лимитер);
+        свои rate_limiter / disk_cache / session передаются через kwargs.
+        """
+        kwargs.setdefault("rate_limiter", RateLimiter(1e6, 1e6))
+        sdk = MyStatSDK(username, password, base_url=self.api_url, **kwargs)
+        sdk.http.trust_env = False  # иначе REQUESTS_CA_BUNDLE / прокси из окружения перекрывают настройки
+        if self.cert_path:
+            sdk.http.verify = self.cert_path
+        sdk.FS_HOSTS = [self.url]
+        sdk.fs_health = HostHealth(sdk.FS_HOSTS)
+        return sdk
+
+    # ---------- поведение ----------
+
+    def delay(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    def should_fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self.lock:
+            return self._rng.random() < self.error_rate
+
+    def issue_token(self, login: str) -> str:
+        with self.lock:
+            self.logins += 1
+            token = f"mock-{login}-{self.logins}"
+            self.tokens[token] = login
+        return token
+
+    def revoke_tokens(self) -> None:
+        """Отзывает все выданные токены — следующий запрос клиента получит 401."""
+        with self.lock:
+            self.tokens.clear()
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.requests: Dict[str, int] = {}
+            self.statuses: Dict[int, int] = {}
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self.logins = 0
+            self.uploads = 0
+            self.handshakes = 0
+
+    def count(self, path: str, status: int, size: int) -> None:
+        key = urlsplit(path).path
+        if key.startswith(API_PREFIX):
+            key = key[len(API_PREFIX):]
+        elif key.startswith("/files/"):
+            key = "/files"
+        with self.lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.bytes_sent += size
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "statuses": dict(self.statuses),
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "logins": self.logins,
+                "uploads": self.uploads,
+                "handshakes": self.handshakes,
+            }
+
+    # ---------- данные ----------
+
+    def _build_data(self, homeworks: int, leaders: int, marks: int) -> None:
+        rng = self._rng
+        today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        self.marks = [{"mark": rng.randint(2, 5), "spec": rng.choice(SUBJECTS)} for _ in range(marks)]
+        self.leaders = [
+            {"fio_stud": f"Студент {i + 1:03d}", "amount": 1000 - i * 7, "position": i + 1}
+            for i in range(leaders)
+        ]
+        self.homeworks: List[Dict[str, Any]] = []
+        for i in range(homeworks):
+            created = today - timedelta(days=i)
+            self.homeworks.append({
+                "id": 100000 + homeworks - i,
+                "creation_time": created.strftime("%Y-%m-%d"),
+                "completion_time": (created + timedelta(days=7)).strftime("%Y-%m-%d"),
+                "file_path": f"{self.url}/files/hw/{100000 + homeworks - i}.pdf",
+                "name_spec": SUBJECTS[i % len(SUBJECTS)],
+                "theme": f"Тема {i + 1}",
+                "fio_teach": "Преподаватель",
+            })
+
+    def route(self, path: str, query: Dict[str, str]) -> Optional[Any]:
+        """JSON-ответ GET-эндпоинта API (path без /v1/mystat) или None — 404."""
+        if path == _ep_path(MyStatSDK.EP_GRADES):
+            return self.marks
+        if path == _ep_path(MyStatSDK.EP_PROGRESS):
+            avg = sum(m["mark"] for m in self.marks) / len(self.marks) if self.marks else 0
+            return {"total_average_point": round(avg, 2)}
+        if path == _ep_path(MyStatSDK.EP_LEADERS):
+            return {"group": {"top": self.leaders}}
+        if path == _ep_path(MyStatSDK.EP_HW_COUNT):
+            n = len(self.homeworks)
+            return [{"counter": n // 10}, {"counter": n - n // 5}, {"counter": n // 10}]
+        if path == _ep_path(MyStatSDK.EP_HW_LIST):
+            return self._homework_page(query)
+        if path == _ep_path(MyStatSDK.EP_ATTENDANCE):
+            return {"percentOfAttendance": 92.3}
+        if path == _ep_path(MyStatSDK.EP_SCHEDULE):
+            return {"data": self._week(query.get("date_filter", ""))}
+        if path == _ep_path(MyStatSDK.EP_FILE_TOKEN):
+            return {"token": "mock-fs-token", "directories": {"homeworkDirId": 1}}
+        return None
+
+    def _homework_page(self, query: Dict[str, str]) -> Dict[str, Any]:
+        try:
+            limit = max(1, int(query.get("limit", 100)))
+            page = max(1, int(query.get("page", 1)))
+        except ValueError:
+            limit, page = 100, 1
+        total = len(self.homeworks)
+        items = self.homeworks[(page - 1) * limit:page * limit]
+        return {
+            "data": items,
+            "_meta": {
+                "totalCount": total,
+                "pageCount": (total + limit - 1) // limit,
+                "currentPage": page,
+                "perPage": limit,
+            },
+        }
+
+    def _week(self, date_filter: str) -> List[Dict[str, Any]]:
+        """Уроки будних дней недели, в которую попадает date_filter."""
+        try:
+            day = datetime.strptime(date_filter, "%Y-%m-%d")
+        except ValueError:
+            return []
+        monday = day - timedelta(days=day.weekday())
+        lessons = []
+        for d in range(5):
+            date = (monday + timedelta(days=d)).strftime("%Y-%m-%d")
+            for n in range(self.lessons_per_day):
+                start = 9 * 60 + n * 100  # пара 1:30 + перемена 10 минут
+                lessons.append({
+                    "date": date,
+                    "lesson": n + 1,
+                    "started_at": f"{start // 60:02d}:{start % 60:02d}",
+                    "finished_at": f"{(start + 90) // 60:02d}:{(start + 90) % 60:02d}",
+                    "subject_name": SUBJECTS[(d * self.lessons_per_day + n) % len(SUBJECTS)],
+                    "teacher_name": "Преподаватель",
+                    "room_name": f"{200 + n}",
+                })
+        # сервер не обещает порядок — перемешиваем, чтобы клиент сортировал сам
+        random.Random(date_filter).shuffle(lessons)
+        return lessons
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--port", type=int, default=8080)
+    p.add_argument("--latency", type=float, default=0.0, help="задержка ответа, сек")
+    p.add_argument("--error-rate", type=float, default=0.0, help="доля GET с ошибкой 503 (0..1)")
+    p.add_argument("--homeworks", type=int, default=100)
+    p.add_argument("--lessons-per-day", type=int, default=3)
+    p.add_argument("--file-size", type=int, default=256 * 1024, help="размер вложения ДЗ, байт")
+    p.add_argument("--tls", action="store_true", help="HTTPS с самоподписанным сертификатом")
+    args = p.parse_args()
+
+    server = MockMyStatServer(
+        args.port, args.latency, args.error_rate, homeworks=args.homeworks,
+        lessons_per_day=args.lessons_per_day, file_size=args.file_size, tls=args.tls,
+    )
+    print(f"MyStat mock: base_url={server.api_url}" + (f" (сертификат {server.cert_path})" if server.tls else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
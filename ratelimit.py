@@ -0,0 +1,151 @@
+""" Ограничение частоты запросов и повторы для MyStat API.
+
+    TokenBucket   — классическое «ведро токенов» с резервированием (потокобезопасно).
+    RateLimiter   — общее ведро на всё SDK + отдельные вёдра по эндпоинтам;
+                    адаптивное (AIMD): на 429 скорость эндпоинта режется вдвое
+                    и ставится пауза по Retry-After, на успехах — плавно растёт обратно.
+    RetryPolicy   — экспоненциальная задержка с полным джиттером в пределах
+                    общего бюджета времени на запрос.
+    """
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Tuple
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        """
+        :param rate: токенов в секунду
+        :param burst: ёмкость ведра (сколько запросов можно сделать залпом)
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._stamp = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def reserve(self) -> float:
+        """Забирает токен (в долг, если нужно) и возвращает, сколько секунд подождать перед запросом."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self) -> float:
+        """Блокирует до разрешения на запрос. Возвращает фактическое ожидание."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def block_for(self, seconds: float) -> None:
+        """Запрещает запросы на seconds секунд (Retry-After)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    DEFAULT_RATE = 10.0  # запросов в секунду на всё SDK
+    DEFAULT_BURST = 10
+    MIN_RATE = 0.2  # ниже при адаптации не опускаемся
+    RECOVERY_STEP = 0.1  # на сколько req/s поднимать скорость после каждого успеха
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        per_endpoint: Optional[Dict[str, Tuple[float, float]]] = None,
+    ):
+        """
+        :param rate: общий лимит запросов в секунду
+        :param burst: общий размер залпа
+        :param per_endpoint: {ключ эндпоинта: (rate, burst)} — дополнительные лимиты
+        """
+        self.global_bucket = TokenBucket(rate or self.DEFAULT_RATE, burst or self.DEFAULT_BURST)
+        self._global_rate = self.global_bucket.rate  # настроенная скорость — потолок восстановления
+        self._limits = dict(per_endpoint or {})
+        self._buckets: Dict[str, TokenBucket] = {k: TokenBucket(*v) for k, v in self._limits.items()}
+        self._lock = threading.Lock()
+        self.throttled = 0  # сколько раз сервер ответил 429
+
+    def _bucket(self, key: Optional[str]) -> Optional[TokenBucket]:
+        return self._buckets.get(key) if key else None
+
+    def acquire(self, key: Optional[str] = None) -> float:
+        """Ждёт разрешения общего ведра и ведра эндпоинта key. Возвращает суммарное ожидание."""
+        waited = self.global_bucket.acquire()
+        bucket = self._bucket(key)
+        if bucket is not None:
+            waited += bucket.acquire()
+        return waited
+
+    def on_throttled(self, key: Optional[str], retry_after: Optional[float] = None) -> None:
+        """Сервер ответил 429: режем скорость вдвое и, если задан Retry-After, замолкаем на это время."""
+        with self._lock:
+            self.throttled += 1
+            bucket = self._bucket(key)
+            if bucket is None and key:
+                # эндпоинт без своего лимита — заводим ведро от общего
+                bucket = self._buckets[key] = TokenBucket(self.global_bucket.rate, self.global_bucket.burst)
+                self._limits[key] = (self.global_bucket.rate, self.global_bucket.burst)
+            target = bucket or self.global_bucket
+            target.rate = max(self.MIN_RATE, target.rate / 2)
+        if retry_after:
+            target.block_for(retry_after)
+
+    def on_success(self, key: Optional[str] = None) -> None:
+        """Успешный ответ: постепенно возвращаем урезанную скорость к настроенной (и у общего ведра)."""
+        bucket = self._bucket(key)
+        if bucket is not None:
+            self._recover(bucket, self._limits[key][0])
+        self._recover(self.global_bucket, self._global_rate)
+
+    def _recover(self, bucket: TokenBucket, ceiling: float) -> None:
+        if bucket.rate < ceiling:
+            with self._lock:
+                bucket.rate = min(ceiling, bucket.rate + self.RECOVERY_STEP)
+
+
+class RetryPolicy:
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    MIN_ATTEMPT_TIME = 1.0  # сек — если от бюджета остаётся меньше, новую попытку не начинаем
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.25, max_delay: float = 8.0, budget: float = 20.0):
+        """
+        :param max_attempts: всего попыток (включая первую)
+        :param base_delay: задержка перед первым повтором до джиттера
+        :param max_delay: потолок одной задержки
+        :param budget: общий бюджет времени на запрос со всеми повторами, сек
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Пауза перед повтором номер attempt (с 0): полный джиттер, но не меньше Retry-After."""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(backoff, retry_after or 0.0)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After в секундах: число секунд или HTTP-дата. None, если заголовка нет или он кривой."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None